@@ -1,12 +1,17 @@
 import base64
 import io
+import json
 import math
+import os
 import numpy as np
-from flask import Flask, request
+from flask import Flask, Response, request, stream_with_context
 from flask_cors import CORS, cross_origin
 from ellipse import LsqEllipse
 from webicd.convert import luv_chroma_to_luv_gama
-from webicd.img import recolor_image
+from webicd.cube import to_cube
+from webicd.img import PALETTES, recolor_image, recolor_image_progressive, recolor_lut
+from webicd.tables import load_tables
+from webicd.recolorConfusionColorStrategies.store import SolutionStore
 
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
@@ -24,9 +29,57 @@ app = Flask(__name__)
 cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
 
+# optional precomputed conversion tables (see webicd/tables.py), memory-mapped
+# so that every gunicorn worker shares the same pages
+load_tables(os.environ.get('WEBICD_RGB_TABLE'),
+            os.environ.get('WEBICD_LUV_TABLE'))
+
 # =======================
 # CONSTANTS
 
+# default palette strategy of /image (see webicd.img.PALETTES)
+PALETTE = os.environ.get('WEBICD_PALETTE', 'kmeans')
+
+# rows recolored at once by /image, bounding the memory of large images
+TILE_ROWS = int(os.environ['WEBICD_TILE_ROWS']) \
+    if os.environ.get('WEBICD_TILE_ROWS') else None
+
+# threads used by /image to recolor the pixels
+RECOLOR_JOBS = int(os.environ['WEBICD_RECOLOR_JOBS']) \
+    if os.environ.get('WEBICD_RECOLOR_JOBS') else None
+
+# dtype of the Luv colors of /image, float32 lowers the peak memory of the
+# recolor by about a quarter (see memory_benchmark.py)
+DTYPE = np.dtype(os.environ.get('WEBICD_DTYPE', 'float64'))
+
+# default pixel budget of the thumbnail /image finds the palette on, the
+# recolor is then applied to the full image (None analyzes the full image)
+MAX_PIXELS = int(os.environ['WEBICD_MAX_PIXELS']) \
+    if os.environ.get('WEBICD_MAX_PIXELS') else None
+
+# smallest thumbnail a request may ask the palette to be found on
+MIN_PIXELS = 16 * 16
+
+# processes running the genetic algorithms of a 'tcc' request
+GA_JOBS = int(os.environ['WEBICD_GA_JOBS']) \
+    if os.environ.get('WEBICD_GA_JOBS') else None
+
+# options of the genetic algorithms of a 'tcc' request: a sqlite3 file of the
+# solutions of previous requests, used to warm start them, and the number of
+# generations without improvement after which they stop
+GA_OPTIONS = {}
+if os.environ.get('WEBICD_SOLUTION_STORE'):
+    GA_OPTIONS['store'] = SolutionStore(
+        path=os.environ['WEBICD_SOLUTION_STORE'])
+if os.environ.get('WEBICD_GA_PLATEAU'):
+    GA_OPTIONS['plateau'] = int(os.environ['WEBICD_GA_PLATEAU'])
+
+# pixel budget of the preview streamed first by /image in progressive mode
+PREVIEW_PIXELS = int(os.environ.get('WEBICD_PREVIEW_PIXELS', 256 * 256))
+
+# range of the grid points of each channel of /lut, the grid has size^3 colors
+LUT_SIZES = (2, 65)
+
 CIRCLE = {
     'center': [-284.2029539, 244.51808],
     'r': math.sqrt(405439.059617)
@@ -36,24 +89,134 @@ CIRCLE = {
 # ROUTES
 
 
+def encode_image(image):
+    """
+    Encodes an image as a base64 JPEG
+
+    Returns:
+        bytes
+    """
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG")
+    return base64.b64encode(buffered.getvalue())
+
+
+def get_pixels(parameters, name, default, minimum):
+    """
+    Reads a pixel budget of the request, None meaning no budget
+
+    Returns:
+        int | None
+
+    Raises:
+        ValueError: If the budget is not an integer of at least minimum
+    """
+    pixels = parameters.get(name, default)
+    if pixels is None:
+        return None
+    try:
+        pixels = int(pixels)
+    except (TypeError, ValueError):
+        pixels = None
+    if pixels is None or pixels < minimum:
+        raise ValueError(f'{name} must be an integer of at least {minimum}')
+    return pixels
+
+
 @app.route("/image", methods=['POST'])
 @cross_origin()
 def image():
     """
     This route receives the image and returns the recolored image
 
+    With 'progressive' set, it streams newline delimited JSON instead: a low
+    resolution preview as soon as the new colors are found, then the full
+    resolution image, each as {'stage': 'preview' | 'final', 'image': str}
+
     Returns:
         str
     """
     parameters = request.json
-    image = recolor_image(parameters['image'], parameters['method'], parameters['ellipse'],
-                          parameters['confusionPoint'], parameters['luminances'])
-    buffered = io.BytesIO()
-    image.save(buffered, format="JPEG")
-    response = base64.b64encode(buffered.getvalue())
+    palette = parameters.get('palette', PALETTE)
+    if palette not in PALETTES:
+        return f'Unknown palette strategy: {palette}', 400
+    try:
+        max_pixels = get_pixels(parameters, 'maxPixels', MAX_PIXELS, MIN_PIXELS)
+    except ValueError as error:
+        return str(error), 400
+    args = (parameters['image'], parameters['method'], parameters['ellipse'],
+            parameters['confusionPoint'], parameters['luminances'])
+    kwargs = dict(minibatch=parameters.get('minibatch', False),
+                  palette=palette,
+                  tile_rows=TILE_ROWS, n_jobs=RECOLOR_JOBS, dtype=DTYPE,
+                  max_pixels=max_pixels, ga_jobs=GA_JOBS,
+                  ga_options=GA_OPTIONS)
+
+    if parameters.get('progressive', False):
+        # validated before the response starts streaming
+        try:
+            preview_pixels = get_pixels(
+                parameters, 'previewPixels', PREVIEW_PIXELS, 1)
+        except ValueError as error:
+            return str(error), 400
+
+        def generate():
+            for (stage, image) in recolor_image_progressive(
+                    *args, preview_pixels=preview_pixels, **kwargs):
+                yield json.dumps({'stage': stage,
+                                  'image': encode_image(image).decode()}) + '\n'
+        return Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson')
+
+    image = recolor_image(*args, **kwargs)
+    response = encode_image(image)
     return response
 
 
+@app.route("/lut", methods=['POST'])
+@cross_origin()
+def lut():
+    """
+    This route receives the same parameters as /image and returns the
+    recoloring as a 3D lookup table, to be applied by the client
+
+    The table is exact only on its grid points: in between, the trilinear
+    interpolation of the client mixes the shifts of neighbouring clusters,
+    which /image keeps apart. On cidade at size 33 the pixels are 6.5 levels
+    off on average and up to 143 on the cluster borders; a larger size lowers
+    the average (3.5 at 65) but not the worst case (see webicd.cube.apply_lut)
+
+    Returns:
+        str: the .cube file ('format': 'cube', default) or the base64 of the
+            size x size x size x 3 uint8 table indexed by [r, g, b] ('format': 'raw'),
+            with size in LUT_SIZES
+    """
+    parameters = request.json
+    palette = parameters.get('palette', PALETTE)
+    if palette not in PALETTES:
+        return f'Unknown palette strategy: {palette}', 400
+    try:
+        size = int(parameters.get('size', 33))
+    except (TypeError, ValueError):
+        size = None
+    if size is None or not LUT_SIZES[0] <= size <= LUT_SIZES[1]:
+        return f'The LUT size must be between {LUT_SIZES[0]} and {LUT_SIZES[1]}', 400
+    try:
+        max_pixels = get_pixels(parameters, 'maxPixels', MAX_PIXELS, MIN_PIXELS)
+    except ValueError as error:
+        return str(error), 400
+    table = recolor_lut(parameters['image'], parameters['method'], parameters['ellipse'],
+                        parameters['confusionPoint'], parameters['luminances'],
+                        size=size,
+                        minibatch=parameters.get('minibatch', False),
+                        palette=palette,
+                        dtype=DTYPE, max_pixels=max_pixels,
+                        ga_jobs=GA_JOBS, ga_options=GA_OPTIONS)
+    if parameters.get('format', 'cube') == 'raw':
+        return base64.b64encode(table.tobytes())
+    return Response(to_cube(table, parameters['image']), mimetype='text/plain')
+
+
 @app.route("/ellipse", methods=['Post'])
 @cross_origin()
 def get_ellipse():
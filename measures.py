@@ -7,9 +7,10 @@ from matplotlib import pyplot as plt
 import numpy as np
 from sklearn.cluster import DBSCAN, KMeans, MiniBatchKMeans, Birch
 from heatmap import annotate_heatmap, heatmap
-from webicd.icd import differentiation
-from webicd.utils import color_distance, get_colors
-from webicd.convert import rgb_to_luv_gama, luv_gama_to_rgb
+from webicd.icd import DiscriminationModel
+from webicd.utils import get_colors
+from webicd.convert import luv_gama_to_rgb_ar
+from webicd.tables import rgb_to_luv_gama_lut
 from scipy.stats import kruskal
 import scikit_posthocs as sp
 
@@ -30,16 +31,14 @@ def dist_img(img_path1: pathlib.Path, img_path2: pathlib.Path):
     img1 = Image.open(img_path1).convert('RGB')
     img2 = Image.open(img_path2).convert('RGB')
 
-    # convert to LUV
-    colors1 = np.apply_along_axis(
-        rgb_to_luv_gama, 2, np.asarray(img1))
-    colors2 = np.apply_along_axis(
-        rgb_to_luv_gama, 2, np.asarray(img2))
+    # convert to LUV, in float32 to halve the memory of large images
+    colors1 = rgb_to_luv_gama_lut(np.asarray(img1), np.float32)
+    colors2 = rgb_to_luv_gama_lut(np.asarray(img2), np.float32)
 
     # calculate difference
-    dist_func = np.vectorize(lambda colors: color_distance(
-        colors[0], colors[1]), signature='(m, n)->()')
-    dists = dist_func(np.stack([colors1, colors2], axis=2))
+    colors1 -= colors2
+    del colors2
+    dists = np.sqrt(np.einsum('...k,...k->...', colors1, colors1))
 
     return np.mean(dists), np.median(dists), np.std(dists), dists.reshape(-1)
 
@@ -57,8 +56,7 @@ def diff_img(img_path: pathlib.Path, ellipse, confusion_point, luminances):
 
     # convert to LUV
     colors = np.array(img)
-    colors = np.apply_along_axis(
-        rgb_to_luv_gama, 2, colors)
+    colors = rgb_to_luv_gama_lut(colors)
     colors = colors.reshape(np.product(
         colors.shape[:2]), colors.shape[2]).astype(float)
 
@@ -71,16 +69,10 @@ def diff_img(img_path: pathlib.Path, ellipse, confusion_point, luminances):
 
     gen_pallete(key_colors, name=img_path)
 
-    diffs = []
-    # calculate differentiation
-    for i in range(len(key_colors)):
-        colorA = key_colors[i]
-        for j in range(i+1, len(key_colors)):
-            colorB = key_colors[j]
-            diff = differentiation(
-                ellipse, confusion_point, luminances, colorA, colorB)
-            # print(f'{colorA} - {colorB} = {diff}')
-            diffs.append(diff)
+    # calculate differentiation between every pair of key colors
+    model = DiscriminationModel(ellipse, confusion_point, luminances)
+    diffs = model.differentiation_matrix(key_colors, key_colors)
+    diffs = diffs[np.triu_indices(len(key_colors), 1)]
 
     return np.mean(diffs), np.median(diffs), np.std(diffs), diffs
 
@@ -99,8 +91,7 @@ def gen_pallete(key_colors, name: pathlib.Path):
     key_colors = np.sort(key_colors, axis=0)
 
     # convert to RGB
-    key_colors = np.apply_along_axis(
-        luv_gama_to_rgb, 2, key_colors).astype(np.uint8)
+    key_colors = luv_gama_to_rgb_ar(key_colors).astype(np.uint8)
 
     key_colors = key_colors.repeat(50, axis=1)
     key_colors = key_colors.repeat(50, axis=0)
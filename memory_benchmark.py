@@ -0,0 +1,126 @@
+from argparse import ArgumentParser
+from math import log
+import pathlib
+import sys
+import tracemalloc
+from PIL import Image
+import numpy as np
+import sklearn.cluster
+from webicd.getColorStrategies.cluster import Cluster
+from webicd.recolorStrategies.cluster import RecolorCluster
+from webicd.tables import luv_gama_to_rgb_lut, rgb_to_luv_gama_lut
+
+dtypes = {'float64': np.float64, 'float32': np.float32}
+
+
+def peak_memory(function, *args):
+    """
+    Runs a function and measures the peak memory it allocates.
+
+    Returns:
+        tuple[object, int]: The result and the peak in bytes.
+    """
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        (_current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def convert_peak(image, dtype):
+    """
+    Measures the peak memory of the Luv round trip of the pixels of an image.
+
+    Returns:
+        int: The peak in bytes.
+    """
+    pixels = np.asarray(image)
+
+    def convert():
+        return luv_gama_to_rgb_lut(rgb_to_luv_gama_lut(pixels, dtype))
+
+    (_output, peak) = peak_memory(convert)
+    return peak
+
+
+def cluster_peak(image, dtype):
+    """
+    Measures the peak memory of finding the palette of an image.
+
+    Returns:
+        int: The peak in bytes.
+    """
+    n_clusters = int(log(image.size[0] * image.size[1]))
+    model = sklearn.cluster.KMeans(n_clusters=n_clusters, random_state=1)
+    cluster = Cluster(model, maxColors=20000, dtype=dtype)
+    (_palette, peak) = peak_memory(cluster.execute, image)
+    return peak
+
+
+def recolor_peak(image, dtype, per_pixel=False):
+    """
+    Measures the peak memory of the recolor of an image, as RecolorCluster
+    runs it by default (each distinct color once) unless per_pixel is set.
+
+    The palette is fitted outside of the measure and mapped onto itself, so
+    that only the Luv conversion and the translation of the pixels count.
+
+    Returns:
+        int: The peak in bytes.
+    """
+    n_clusters = int(log(image.size[0] * image.size[1]))
+    model = sklearn.cluster.KMeans(n_clusters=n_clusters, random_state=1)
+    palette = Cluster(model, maxColors=20000, dtype=dtype).execute(image)
+    color_dict = {color: color for color in palette}
+
+    recolor = RecolorCluster(model, unique=not per_pixel, dtype=dtype)
+    (_output, peak) = peak_memory(recolor.execute, image, color_dict)
+    return peak
+
+
+if __name__ == '__main__':
+    # parse arguments
+    parser = ArgumentParser(
+        description='Measures the peak memory per pixel of the conversions, '
+        'the clustering and the recolor.')
+    parser.add_argument(
+        '-i', '--images', metavar='str', type=str, nargs='+',
+        default=["flor", "cidade", "floresta", "ishihara", "maca"])
+    parser.add_argument(
+        '-d', '--dtypes', metavar='str', type=str, choices=list(dtypes),
+        nargs='+', default=list(dtypes))
+    parser.add_argument(
+        '-s', '--stages', metavar='str', type=str,
+        choices=['convert', 'cluster', 'recolor'], nargs='+',
+        default=['convert', 'cluster', 'recolor'])
+    parser.add_argument('--per-pixel', action='store_true',
+                        help='recolor each pixel instead of each distinct color')
+    parser.add_argument('--max-bytes-per-pixel', metavar='float', type=float,
+                        default=None, help='fail when a peak is above it')
+    args = parser.parse_args()
+
+    image_dir = pathlib.Path('images')
+    failed = False
+
+    for name in args.images:
+        image = Image.open(image_dir.joinpath(
+            f'{name}-original.png')).convert('RGB')
+        pixels = image.size[0] * image.size[1]
+        for dtype in args.dtypes:
+            for stage in args.stages:
+                if stage == 'convert':
+                    peak = convert_peak(image, dtypes[dtype])
+                elif stage == 'cluster':
+                    peak = cluster_peak(image, dtypes[dtype])
+                else:
+                    peak = recolor_peak(image, dtypes[dtype], args.per_pixel)
+                per_pixel = peak / pixels
+                print(f'# {name} {dtype} {stage}: {pixels} pixels, peak {peak} bytes, '
+                      f'{per_pixel:.1f} bytes/pixel')
+                if args.max_bytes_per_pixel is not None and \
+                        per_pixel > args.max_bytes_per_pixel:
+                    failed = True
+
+    sys.exit(1 if failed else 0)
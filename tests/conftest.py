@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def calibration():
+    """
+    The (ellipse, confusion_point, luminances) of a protan calibration.
+    """
+    ellipse = {'center': [-73.77114992493914, 6.106258598586408], 'height': 15.735585987622771,
+               'phi': -0.058370397376381784, 'width': 91.66005948620332}
+    luminances = {'top': 55.859375, 'bottom': 46.484375}
+    confusion_point = [-25.830984638903384, 826.482842779623]
+    return ellipse, confusion_point, luminances
+
+
+@pytest.fixture
+def palette():
+    """
+    A synthetic Luv palette dense enough to have confusing pairs.
+    """
+    rng = np.random.default_rng(0)
+    return [tuple(color) for color in
+            rng.uniform([40, -40, -40], [60, 40, 40], (60, 3)).tolist()]
@@ -0,0 +1,58 @@
+import base64
+
+import pytest
+
+from app import app
+
+PARAMETERS = {
+    'image': 'flor',
+    'method': 'original',
+    'ellipse': {'center': [-73.77, 6.106], 'height': 15.73, 'phi': -0.058, 'width': 91.66},
+    'confusionPoint': [-25.83, 826.48],
+    'luminances': {'top': 55.86, 'bottom': 46.48},
+}
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize('route', ['/image', '/lut'])
+@pytest.mark.parametrize('max_pixels', [2, -5, 'x', [1]])
+def test_invalid_max_pixels(client, route, max_pixels):
+    response = client.post(route, json={**PARAMETERS, 'maxPixels': max_pixels})
+    assert response.status_code == 400
+
+
+def test_lut_max_pixels(client):
+    response = client.post('/lut', json={**PARAMETERS, 'maxPixels': 16 * 16,
+                                         'size': 2, 'format': 'raw'})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('preview_pixels', [0, -1, 'x'])
+def test_invalid_preview_pixels(client, preview_pixels):
+    response = client.post('/image', json={**PARAMETERS, 'progressive': True,
+                                           'previewPixels': preview_pixels})
+    assert response.status_code == 400
+    assert response.mimetype != 'application/x-ndjson'
+
+
+@pytest.mark.parametrize('size', [2, 3])
+def test_lut_formats(client, size):
+    parameters = {**PARAMETERS, 'maxPixels': 16 * 16, 'size': size}
+    raw = client.post('/lut', json={**parameters, 'format': 'raw'})
+    assert raw.status_code == 200
+    assert len(base64.b64decode(raw.data)) == size ** 3 * 3
+    cube = client.post('/lut', json=parameters)
+    assert cube.status_code == 200
+    lines = cube.get_data(as_text=True).splitlines()
+    assert lines[1] == f'LUT_3D_SIZE {size}'
+    assert len(lines) == 4 + size ** 3
+
+
+@pytest.mark.parametrize('size', [1, 66, 'x'])
+def test_invalid_lut_size(client, size):
+    response = client.post('/lut', json={**PARAMETERS, 'size': size})
+    assert response.status_code == 400
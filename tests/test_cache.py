@@ -0,0 +1,68 @@
+import numpy as np
+
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
+from webicd.recolorConfusionColorStrategies.cache import FitnessCache
+from webicd.recolorConfusionColorStrategies.genetic import GeneticRecolor
+
+
+def test_eviction_at_size():
+    cache = FitnessCache(size=2)
+    [a, b, c] = cache.keys([[1, 0, 0], [2, 0, 0], [3, 0, 0]])
+    cache.put(a, 1.0)
+    cache.put(b, 2.0)
+    # reading a makes b the least recently used
+    assert cache.get(a) == 1.0
+    cache.put(c, 3.0)
+    assert list(cache.entries) == [a, c]
+    assert cache.get(b) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_step_keys():
+    cache = FitnessCache(step=(1, 0.1, 0.1))
+    [a, b, c] = cache.keys([[50.2, 0.31, -0.01], [49.9, 0.29, 0.02], [51, 0.3, 0]])
+    # -0.01 and 0.02 both round to 0, whatever the sign
+    assert a == b != c
+
+
+def test_wrap_counts():
+    calls = []
+
+    def fitness(solution, solution_idx):
+        calls.append(solution_idx)
+        return float(np.sum(solution))
+
+    cached = FitnessCache().wrap(fitness)
+    assert cached(np.asarray([1.0, 2, 3]), 0) == 6
+    assert cached(np.asarray([1.0, 2, 3]), 1) == 6
+    assert cached(np.asarray([1.0, 2, 4]), 2) == 7
+    assert calls == [0, 2]
+
+
+def test_wrap_population_evaluates_missing_rows():
+    evaluated = []
+
+    def fitness(population):
+        evaluated.append(population.copy())
+        return population.sum(axis=1)
+
+    cache = FitnessCache()
+    cached = cache.wrap_population(fitness)
+    first = np.asarray([[1.0, 0, 0], [2, 0, 0], [3, 0, 0]])
+    assert cached(first).tolist() == [1, 2, 3]
+    second = np.asarray([[2.0, 0, 0], [4, 0, 0], [1, 0, 0], [5, 0, 0]])
+    assert cached(second).tolist() == [2, 4, 1, 5]
+    assert np.array_equal(evaluated[1], [[4, 0, 0], [5, 0, 0]])
+    # nothing is evaluated when every row is cached
+    assert cached(second[::-1]).tolist() == [5, 1, 4, 2]
+    assert len(evaluated) == 2
+    assert (cache.hits, cache.misses) == (6, 5)
+
+
+def test_exact_cache_keeps_solutions(calibration, palette):
+    graph = KDTreeGraphGenerator(*calibration).execute(palette[:20])
+    expected = GeneticRecolor(*calibration, random_state=1, num_generations=20).execute(graph)
+    genetic = GeneticRecolor(*calibration, random_state=1, num_generations=20, cache_size=4096)
+    assert genetic.execute(graph) == expected
+    # every evaluation went through the cache
+    assert genetic.cache_misses_ > 0
@@ -0,0 +1,58 @@
+import numpy as np
+
+from webicd.findConfusionColorStrategies.graph import GraphGenerator
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
+from webicd.icd import DiscriminationModel
+from webicd.utils import sigmoid
+
+
+def brute_force(calibration, colors):
+    # the original all-pairs loop, on the geometric ellipsoid intersection
+    (ellipse, _confusion_point, luminances) = calibration
+    edges = []
+    diffs = []
+    for i in range(len(colors)):
+        for j in range(i + 1, len(colors)):
+            diff = sigmoid(list(colors[i]), list(colors[j]), ellipse, luminances)
+            if diff <= 1:
+                edges.append((i, j))
+                diffs.append(diff)
+    return edges, diffs
+
+
+def test_model_matches_sigmoid(calibration, palette):
+    (ellipse, _confusion_point, luminances) = calibration
+    model = DiscriminationModel(*calibration)
+    colors = [list(color) for color in palette]
+    expected = np.asarray([[sigmoid(color1, color2, ellipse, luminances)
+                            for color2 in colors] for color1 in colors])
+    # the diagonal holds the equal colors
+    assert np.all(np.diag(expected) == 0)
+    assert np.allclose(model.differentiation_matrix(palette, palette), expected,
+                       rtol=1e-12, atol=0)
+    for (i, color1) in enumerate(colors):
+        assert model.differentiation(color1, color1) == 0
+        for (j, color2) in enumerate(colors):
+            assert np.isclose(model.differentiation(color1, color2), expected[i, j],
+                              rtol=1e-12, atol=0)
+
+
+def test_graph_matches_brute_force(calibration, palette):
+    # small blocks, so that the pairs span several of them
+    graph = GraphGenerator(*calibration, chunk_size=64).execute(palette)
+    (edges, diffs) = brute_force(calibration, palette)
+    assert graph.get_edgelist() == edges
+    assert np.allclose(graph.es['diff'], diffs)
+
+
+def test_kdtree_matches_brute_force(calibration, palette):
+    graph = KDTreeGraphGenerator(*calibration).execute(palette)
+    (edges, diffs) = brute_force(calibration, palette)
+    assert len(edges) > 0
+    assert graph.get_edgelist() == edges
+    assert np.allclose(graph.es['diff'], diffs)
+    assert graph.vs['color'] == palette
+
+
+def test_kdtree_without_colors(calibration):
+    assert KDTreeGraphGenerator(*calibration).execute([]).ecount() == 0
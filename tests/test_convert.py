@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from webicd import convert
+
+rng = np.random.default_rng(0)
+
+# a grid of the sRGB cube, with both sides of the gamma branch at 10 and 11
+RGB = np.concatenate([
+    np.stack(np.meshgrid(*[np.arange(0, 256, 5)] * 3, indexing='ij'), axis=-1).reshape(-1, 3),
+    [[10, 10, 10], [11, 11, 11], [0, 0, 0], [255, 255, 255]]])
+
+# black has a zero u'v' denominator
+XYZ = np.concatenate([
+    rng.uniform(0, 110, (3000, 3)),
+    [[0, 0, 0], [np.nan, 1, 1], [1, np.nan, 1], [1, 1, np.nan]]])
+
+# L = 8 is on the linear branch of Y
+LUV_GAMA = np.concatenate([
+    rng.uniform([1, -150, -150], [100, 150, 150], (3000, 3)),
+    [[8, -3, 2], [np.nan, 1, 1], [50, np.nan, 1], [50, 1, np.nan]]])
+
+LUV_CHROMA = np.concatenate([
+    rng.uniform([1, 0, 0], [100, 0.7, 0.6], (3000, 3)),
+    [[8, 0.2, 0.4], [np.nan, 0.2, 0.3], [50, np.nan, 0.2], [50, 0.2, np.nan]]])
+
+
+@pytest.mark.parametrize('scalar,array,colors', [
+    (convert.rgb_to_xyz, convert.rgb_to_xyz_ar, RGB),
+    (convert.rgb_to_luv_chroma, convert.rgb_to_luv_chroma_ar, RGB),
+    (convert.rgb_to_luv_gama, convert.rgb_to_luv_gama_ar, RGB),
+    (convert.get_up, convert.get_up_ar, XYZ),
+    (convert.get_vp, convert.get_vp_ar, XYZ),
+    (convert.xyz_to_rgb, convert.xyz_to_rgb_ar, XYZ),
+    (convert.xyz_to_luv_chroma, convert.xyz_to_luv_chroma_ar, XYZ),
+    (convert.luv_chroma_to_luv_gama, convert.luv_chroma_to_luv_gama_ar, LUV_CHROMA),
+    (convert.luv_chroma_to_xyz, convert.luv_chroma_to_xyz_ar, LUV_CHROMA),
+    (convert.luv_chroma_to_rgb, convert.luv_chroma_to_rgb_ar, LUV_CHROMA),
+    (convert.luv_gama_to_xyz, convert.luv_gama_to_xyz_ar, LUV_GAMA),
+    (convert.luv_gama_to_rgb, convert.luv_gama_to_rgb_ar, LUV_GAMA),
+])
+def test_array_matches_scalar(scalar, array, colors):
+    expected = np.asarray([scalar([float(c) for c in color]) for color in colors])
+    output = array(colors)
+    assert output.dtype == np.float64
+    # bit for bit, NaN where the scalar gives NaN
+    assert np.array_equal(output, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize('array', [convert.luv_gama_to_xyz_ar, convert.luv_gama_to_rgb_ar])
+def test_array_black(array):
+    # the scalar conversions divide by zero at L = 0, the array ones give black
+    with pytest.raises(ZeroDivisionError):
+        convert.luv_gama_to_xyz([0.0, 0.0, 0.0])
+    assert np.array_equal(array([[0, 0, 0], [0, 5, -5]]), np.zeros((2, 3)))
+
+
+def test_array_keeps_float32():
+    assert convert.rgb_to_luv_gama_ar(RGB.astype(np.float32)).dtype == np.float32
+    assert convert.rgb_to_luv_gama_ar(RGB, np.float32).dtype == np.float32
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from webicd.cube import apply_lut, to_cube
+from webicd.getColorStrategies.quantize import GridQuantize
+from webicd.img import load_image
+from webicd.recolorStrategies.cluster import RecolorCluster
+from webicd.utils import resize_to_budget
+
+
+@pytest.fixture(scope='module')
+def recolor():
+    # palette found on a thumbnail, each color shifted at random
+    image = resize_to_budget(load_image('cidade'), 200000)
+    quantize = GridQuantize(13)
+    palette = quantize.execute(resize_to_budget(image, 40000))
+    rng = np.random.default_rng(0)
+    color_dict = {color: tuple(np.asarray(color) + rng.uniform(-20, 20, 3))
+                  for color in palette}
+    return image, RecolorCluster(quantize), color_dict
+
+
+def test_to_cube_red_fastest():
+    lut = np.random.default_rng(0).integers(0, 256, (3, 3, 3, 3), dtype=np.uint8)
+    lines = to_cube(lut, 'test').splitlines()
+    assert lines[:4] == ['TITLE "test"', 'LUT_3D_SIZE 3',
+                         'DOMAIN_MIN 0.0 0.0 0.0', 'DOMAIN_MAX 1.0 1.0 1.0']
+    points = np.asarray([line.split() for line in lines[4:]], dtype=float)
+    assert len(points) == 27
+    for (r, g, b) in np.ndindex(3, 3, 3):
+        assert np.allclose(points[r + 3 * g + 9 * b] * 255, lut[r, g, b], atol=1e-3)
+
+
+def test_export_lut_indexed_by_rgb(recolor):
+    (_image, recolor_cluster, color_dict) = recolor
+    # the grid of size 18 falls on the integers 0, 15, ..., 255
+    lut = recolor_cluster.export_lut(color_dict, 18)
+    grid = np.stack(np.meshgrid(*[np.arange(0, 256, 15)] * 3, indexing='ij'), axis=-1)
+    deltas = RecolorCluster.deltas(
+        recolor_cluster.model.cluster_centers_, color_dict)
+    direct = recolor_cluster.recolor_pixels(grid.reshape(-1, 3).astype(np.uint8), deltas)
+    assert np.array_equal(lut.reshape(-1, 3), direct)
+    # interpolating on the grid points gives them back
+    assert np.array_equal(apply_lut(grid.astype(np.uint8), lut), lut)
+
+
+def test_apply_lut_error(recolor):
+    # between the grid points the interpolation mixes the shifts of
+    # neighbouring clusters, the error shrinks on average with the size but
+    # stays up to the full range on the cluster borders
+    (image, recolor_cluster, color_dict) = recolor
+    direct = recolor_cluster.execute(image, color_dict).astype(int)
+    errors = [
+        np.abs(apply_lut(np.asarray(image), recolor_cluster.export_lut(color_dict, size))
+               .astype(int) - direct).mean()
+        for size in (17, 33, 65)]
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[1] < 10
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from webicd.gamut import get_gamut
+from webicd.recolorConfusionColorStrategies.genetic import GENE_BOUNDS
+from webicd.utils import (is_visible_luv_chroma, is_visible_luv_chroma_ar,
+                          is_visible_luv_gama_ar, random_luv_chroma)
+
+
+def test_visibility_ar_matches_scalar():
+    rng = np.random.default_rng(0)
+    luv = rng.uniform([0, 0, 0], [100, 0.7, 0.6], (500, 3))
+    expected = [is_visible_luv_chroma(color) for color in luv]
+    assert is_visible_luv_chroma_ar(luv).tolist() == expected
+
+
+@pytest.mark.parametrize('space,bounds,visible', [
+    ('chroma', None, is_visible_luv_chroma_ar),
+    ('gama', GENE_BOUNDS, is_visible_luv_gama_ar),
+])
+def test_sample_is_visible(space, bounds, visible):
+    colors = get_gamut(space, bounds).sample(10000, np.random.default_rng(0))
+    assert colors.shape == (10000, 3)
+    assert visible(colors).all()
+
+
+def test_sample_is_visible_without_redraws():
+    # near the white point most cells are cut by the border
+    colors = get_gamut('chroma').sample(
+        1000, np.random.default_rng(0), luminance=99.9, max_tries=0)
+    assert (colors[:, 0] == 99.9).all()
+    assert is_visible_luv_chroma_ar(colors).all()
+
+
+def test_sample_without_visible_colors():
+    with pytest.raises(ValueError):
+        get_gamut('chroma').sample(10, np.random.default_rng(0), luminance=200)
+
+
+def test_random_luv_chroma():
+    color = random_luv_chroma(50, np.random.default_rng(1))
+    assert color[0] == 50
+    assert is_visible_luv_chroma(color)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
+from webicd.recolorConfusionColorStrategies.genetic import GeneticRecolor
+
+
+@pytest.fixture
+def graph(calibration, palette):
+    # the first colors, enough for a few confusing vertices
+    return KDTreeGraphGenerator(*calibration).execute(palette[:20])
+
+
+@pytest.mark.parametrize('gamut_init', [True, False])
+def test_native_matches_pygad(calibration, graph, gamut_init):
+    color_dicts = [GeneticRecolor(*calibration, random_state=1, backend=backend,
+                                  num_generations=20, gamut_init=gamut_init).execute(graph)
+                   for backend in ('native', 'pygad')]
+    assert color_dicts[0] == color_dicts[1]
+    # some colors were recolored
+    assert any(color != new_color for (color, new_color) in color_dicts[0].items())
+
+
+@pytest.mark.parametrize('gamut_init', [True, False])
+def test_native_matches_pygad_with_seeds(calibration, palette, gamut_init):
+    seeds = np.asarray([[50, 0.3, 0.3], [120, -1, 0.2]])
+    solutions = []
+    for backend in ('native', 'pygad'):
+        genetic = GeneticRecolor(*calibration, random_state=1, backend=backend,
+                                 num_generations=20, gamut_init=gamut_init)
+        (solution, fitness, generations, _cache) = genetic.optimize(0, palette[:10], seeds)
+        solutions.append((solution.tolist(), fitness, generations))
+    assert solutions[0] == solutions[1]
+
+
+def test_pool_matches_serial(calibration, graph):
+    serial = GeneticRecolor(*calibration, random_state=1, num_generations=20)
+    pool = GeneticRecolor(*calibration, random_state=1, num_generations=20, n_jobs=2)
+    assert pool.execute(graph) == serial.execute(graph)
+    assert pool.generations_ == serial.generations_
+
+
+@pytest.mark.parametrize('criterion,expected', [
+    ({'plateau': 3}, None),
+    ({'stop_when_distinct': True}, None),
+    # 20 evaluations, then 19 per generation: the fifth would exceed 100
+    ({'max_evaluations': 100}, 4),
+    # the time limit is checked after each generation
+    ({'time_limit': 0}, 1),
+])
+def test_early_stopping(calibration, graph, criterion, expected):
+    generations = []
+    for backend in ('native', 'pygad'):
+        genetic = GeneticRecolor(*calibration, random_state=1, backend=backend,
+                                 num_generations=200, **criterion)
+        genetic.execute(graph)
+        generations.append(genetic.generations_)
+    assert generations[0] == generations[1]
+    assert len(generations[0]) > 0
+    # some runs stopped early, the others ran every generation
+    assert all(0 < g <= 200 for g in generations[0].values())
+    assert min(generations[0].values()) < 200
+    if expected is not None:
+        assert set(generations[0].values()) == {expected}
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+from igraph import Graph
+
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
+from webicd.recolorConfusionColorStrategies.greedy import GreedyScheduler
+
+
+def maxdegree_order(graph):
+    # the original loop of the recolor strategies
+    graph = graph.copy()
+    order = []
+    while len(graph.vs(_degree_gt=0)) > 0:
+        v = graph.vs.select(_degree=graph.maxdegree())[0]
+        order.append(v.index)
+        graph.delete_edges(v.all_edges())
+    return order
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_maxdegree_loop(seed):
+    # igraph draws from the random module
+    random.seed(seed)
+    graph = Graph.Erdos_Renyi(n=80, m=200)
+    assert list(GreedyScheduler(graph)) == maxdegree_order(graph)
+
+
+def test_matches_maxdegree_loop_on_confusion_graph(calibration, palette):
+    graph = KDTreeGraphGenerator(*calibration).execute(palette)
+    order = list(GreedyScheduler(graph))
+    assert len(order) > 0
+    assert order == maxdegree_order(graph)
+    # the graph is left untouched
+    assert graph.ecount() > 0
+
+
+def test_without_edges():
+    assert list(GreedyScheduler(Graph(n=3))) == []
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from webicd.getColorStrategies.quantize import GridQuantize
+from webicd.img import load_image
+from webicd.tables import rgb_to_luv_gama_lut
+
+
+@pytest.mark.parametrize('n_colors', [1, 12])
+def test_grid_palette_budget(n_colors):
+    image = load_image('ishihara')
+    quantize = GridQuantize(n_colors)
+    colors = quantize.execute(image)
+    assert len(colors) == n_colors
+    assert quantize.pixel_labels_.max() == n_colors - 1
+
+    # the pixels of the dropped cells are predicted as they were assigned
+    pixels = rgb_to_luv_gama_lut(np.asarray(image).reshape(-1, 3))
+    assert np.array_equal(quantize.predict(pixels), quantize.pixel_labels_)
+
+
+def test_grid_every_cell():
+    image = load_image('ishihara')
+    assert len(GridQuantize().execute(image)) > len(GridQuantize(12).execute(image))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from webicd.getColorStrategies.quantize import GridQuantize
+from webicd.img import load_image
+from webicd.recolorStrategies.cluster import RecolorCluster
+from webicd.utils import resize_to_budget
+
+
+def test_deltas_by_label():
+    centers = np.asarray([[50.0, 1.0, 2.0], [20.0, -3.0, 4.0]])
+    color_dict = {tuple(centers[1]): (25.0, -3.0, 0.0),
+                  tuple(centers[0]): (50.0, 1.0, 2.0)}
+    deltas = RecolorCluster.deltas(centers, color_dict)
+    assert np.array_equal(deltas, [[0, 0, 0], [-5, 0, 4]])
+
+
+def test_deltas_of_another_model():
+    centers = np.asarray([[50.0, 1.0, 2.0]])
+    with pytest.raises(KeyError):
+        RecolorCluster.deltas(centers, {(50.0, 1.0, 2.0 + 1e-9): (0, 0, 0)})
+
+
+@pytest.mark.parametrize('image_name', ['flor', 'cidade'])
+@pytest.mark.parametrize('unique', [True, False])
+def test_float32_matches_float64(image_name, unique):
+    # palette found on a thumbnail, so the labels come from predict
+    image = load_image(image_name)
+    quantize = GridQuantize(13)
+    palette = quantize.execute(resize_to_budget(image, 40000))
+    rng = np.random.default_rng(0)
+    color_dict = {color: tuple(np.asarray(color) + rng.uniform(-20, 20, 3))
+                  for color in palette}
+
+    (output64, output32) = [
+        RecolorCluster(quantize, unique=unique, dtype=dtype).execute(image, color_dict)
+        for dtype in (np.float64, np.float32)]
+    assert np.abs(output64.astype(int) - output32.astype(int)).max() <= 1
+
+
+@pytest.mark.parametrize('thumbnail', [False, True])
+@pytest.mark.parametrize('unique', [True, False])
+def test_bands_and_threads_match_whole_image(thumbnail, unique):
+    # with the palette of the full image the labels come from the quantizer,
+    # with the one of a thumbnail from predict
+    image = load_image('cidade')
+    quantize = GridQuantize(13)
+    palette = quantize.execute(resize_to_budget(image, 40000) if thumbnail else image)
+    rng = np.random.default_rng(0)
+    color_dict = {color: tuple(np.asarray(color) + rng.uniform(-20, 20, 3))
+                  for color in palette}
+
+    expected = RecolorCluster(quantize, unique=unique).execute(image, color_dict)
+    # 37 rows do not divide the 405 of the image, nor do 4 bands
+    assert image.size[1] % 37 != 0 and image.size[1] % 4 != 0
+    for (tile_rows, n_jobs) in [(37, None), (37, 3), (None, 4)]:
+        output = RecolorCluster(quantize, unique=unique, tile_rows=tile_rows,
+                                n_jobs=n_jobs).execute(image, color_dict)
+        assert np.array_equal(output, expected), (tile_rows, n_jobs)
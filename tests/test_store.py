@@ -0,0 +1,105 @@
+import pickle
+from threading import Lock
+
+import numpy as np
+import pytest
+
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
+from webicd.recolorConfusionColorStrategies.genetic import GeneticRecolor
+from webicd.recolorConfusionColorStrategies.store import SolutionStore, profile_key
+
+
+@pytest.fixture
+def profile(calibration):
+    return profile_key(*calibration)
+
+
+def test_lru_eviction(profile):
+    store = SolutionStore(step=10, size=2, radius=0)
+    store.put(profile, (5, 5, 5), (1, 1, 1))
+    store.put(profile, (15, 5, 5), (2, 2, 2))
+    # reading the first cell makes the second the least recently used
+    assert store.get(profile, (5, 5, 5)).tolist() == [[1, 1, 1]]
+    store.put(profile, (25, 5, 5), (3, 3, 3))
+    assert store.get(profile, (15, 5, 5)).tolist() == []
+    assert store.get(profile, (5, 5, 5)).tolist() == [[1, 1, 1]]
+    assert store.get(profile, (25, 5, 5)).tolist() == [[3, 3, 3]]
+
+
+def test_search_order(profile):
+    store = SolutionStore(step=10, max_seeds=3)
+    # a corner, an edge and a face neighbour of the cell of (5, 5, 5), and a
+    # cell out of the radius
+    store.put(profile, (15, 15, 15), (3, 3, 3))
+    store.put(profile, (15, 15, 5), (2, 2, 2))
+    store.put(profile, (5, 5, -5), (1, 1, 1))
+    store.put(profile, (25, 5, 5), (9, 9, 9))
+    assert store.get(profile, (5, 5, 5)).tolist() == [[1, 1, 1], [2, 2, 2], [3, 3, 3]]
+    store.put(profile, (5, 5, 5), (0, 0, 0))
+    assert store.get(profile, (5, 5, 5)).tolist() == [[0, 0, 0], [1, 1, 1], [2, 2, 2]]
+    # the profiles do not share solutions
+    assert store.get('other', (5, 5, 5)).shape == (0, 3)
+
+
+def test_database_round_trip(profile, tmp_path):
+    path = str(tmp_path / 'solutions.sqlite3')
+    SolutionStore(path=path).put(profile, (50, 0.1, 0.2), (60, 0.3, 0.4))
+    store = SolutionStore(path=path)
+    assert store.get(profile, (51, 0.1, 0.2)).tolist() == [[60, 0.3, 0.4]]
+    # a second solution of the cell replaces the first one
+    store.put(profile, (52, 0.1, 0.2), (70, 0.5, 0.5))
+    assert SolutionStore(path=path).get(profile, (50, 0.1, 0.2)).tolist() == [[70, 0.5, 0.5]]
+
+
+def test_pickle(profile, tmp_path):
+    store = SolutionStore(path=str(tmp_path / 'solutions.sqlite3'))
+    store.put(profile, (50, 0.1, 0.2), (60, 0.3, 0.4))
+    copy = pickle.loads(pickle.dumps(store))
+    assert isinstance(copy.lock, type(Lock())) and copy.lock is not store.lock
+    assert copy.entries == store.entries
+    copy.put(profile, (90, 0.1, 0.2), (80, 0.3, 0.4))
+    # the copies share the database
+    assert store.get(profile, (90, 0.1, 0.2)).tolist() == [[80, 0.3, 0.4]]
+
+
+@pytest.mark.parametrize('backend', ['native', 'pygad'])
+@pytest.mark.parametrize('gamut_init', [True, False])
+def test_seeds_reach_initial_population(calibration, palette, profile, backend, gamut_init):
+    store = SolutionStore()
+    store.put(profile, palette[0], (50, 0.3, 0.3))
+    store.put(profile, np.asarray(palette[0]) + (5, 0, 0), (40, 0.2, 0.1))
+    genetic = GeneticRecolor(*calibration, random_state=1, backend=backend,
+                             num_generations=0, gamut_init=gamut_init, store=store)
+    seeds = store.get(genetic.profile, palette[0])
+    assert seeds.tolist() == [[50, 0.3, 0.3], [40, 0.2, 0.1]]
+    if backend == 'native':
+        ga_instance = genetic.get_native_GA(palette[0], palette[1:10], 0.5, seeds=seeds)
+        ga_instance.run()
+    else:
+        ga_instance = genetic.get_GA(palette[0], palette[1:10], 0.5, seeds=seeds)
+    assert np.array_equal(ga_instance.population[:2], seeds)
+
+
+def test_execute_reads_and_fills_store(calibration, palette, monkeypatch):
+    graph = KDTreeGraphGenerator(*calibration).execute(palette[:20])
+    store = SolutionStore()
+    genetic = GeneticRecolor(*calibration, random_state=1, num_generations=5, store=store)
+    color_dict = genetic.execute(graph)
+    recolored = [color for (color, new_color) in color_dict.items() if color != new_color]
+    assert len(recolored) > 0 and len(store.entries) > 0
+
+    # the solutions of the first run seed the second one
+    expected = {index: store.get(genetic.profile, graph.vs[index]['color'])
+                for index in genetic.generations_}
+    received = {}
+    optimize = GeneticRecolor.optimize
+
+    def spy(self, index, colors, seeds=None):
+        received[index] = seeds
+        return optimize(self, index, colors, seeds)
+    monkeypatch.setattr(GeneticRecolor, 'optimize', spy)
+    genetic.execute(graph)
+    assert received.keys() == expected.keys()
+    for (index, seeds) in received.items():
+        assert len(seeds) > 0
+        assert np.array_equal(seeds, expected[index])
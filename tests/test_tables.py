@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from webicd import tables
+from webicd.convert import luv_gama_to_rgb_ar, rgb_to_luv_gama_ar
+from webicd.img import load_image
+
+
+@pytest.fixture(scope='module')
+def luv_table(tmp_path_factory):
+    path = tmp_path_factory.mktemp('tables') / 'luv_gama_to_rgb.npy'
+    tables.build_luv_table(str(path))
+    tables.load_tables(luv_path=str(path))
+    yield
+    tables.LUV_GAMA_TO_RGB_TABLE = None
+
+
+def levels(rgb):
+    return np.asarray(rgb).astype(np.uint8).astype(int)
+
+
+@pytest.mark.parametrize('image_name', ['flor', 'ishihara'])
+def test_round_trip(luv_table, image_name):
+    pixels = np.asarray(load_image(image_name)).reshape(-1, 3)
+    luv = rgb_to_luv_gama_ar(pixels)
+    error = np.abs(levels(tables.luv_gama_to_rgb_lut(luv)) -
+                   levels(luv_gama_to_rgb_ar(luv)))
+    assert error.max() <= 8
+
+
+def test_dark_and_outside_colors_are_exact(luv_table):
+    luv = np.asarray([[3, 10, -20], [50, 250, 0], [50, 0, -200], [0, 0, 0]], dtype=float)
+    assert np.array_equal(tables.luv_gama_to_rgb_lut(luv), luv_gama_to_rgb_ar(luv))
+
+
+def test_keeps_shape_and_dtype(luv_table):
+    luv = rgb_to_luv_gama_ar(np.full((4, 5, 3), 128), np.float32)
+    rgb = tables.luv_gama_to_rgb_lut(luv)
+    assert rgb.shape == (4, 5, 3)
+    assert rgb.dtype == np.float32
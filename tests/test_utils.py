@@ -0,0 +1,22 @@
+import pytest
+
+from webicd.img import load_image
+from webicd.utils import get_colors, get_colors_count
+
+
+def getcolors_count(image, max=None):
+    # the original count, by PIL
+    colors = image.getcolors(image.size[0]*image.size[1])
+    colors = sorted(colors, reverse=True)
+    if max is not None:
+        colors = colors[0:max]
+    return colors
+
+
+@pytest.mark.parametrize('image_name', ['flor', 'cidade'])
+@pytest.mark.parametrize('max', [None, 1, 50, 20000])
+def test_colors_count_matches_getcolors(image_name, max):
+    image = load_image(image_name)
+    expected = getcolors_count(image, max)
+    assert get_colors_count(image, max) == expected
+    assert get_colors(image, max) == [color for (_, color) in expected]
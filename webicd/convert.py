@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 # D65 white in XYZ
 WHITEREF = [95.047, 100.00, 108.883]
@@ -160,3 +161,171 @@ def luv_gama_to_rgb(luv_gama):
 
 def convert_ar(ar, method):
     return list(map(method, ar))
+
+
+# =======================
+# ARRAY CONVERSIONS
+#
+# The functions below mirror the scalar conversions above but work on arrays
+# whose last axis holds the three channels, e.g. (N, 3) or (H, W, 3). Float
+# input keeps its precision (float32 stays float32), anything else is
+# converted to float64 unless a dtype is given.
+
+
+def float_ar(ar, dtype=None):
+    ar = np.asarray(ar)
+    if dtype is not None:
+        return ar.astype(dtype, copy=False)
+    if np.issubdtype(ar.dtype, np.floating):
+        return ar
+    return ar.astype(float)
+
+
+def fmt_ar(n):
+    return np.where(np.isnan(n), 0, n)
+
+
+def get_up_ar(xyz):
+    xyz = float_ar(xyz)
+    X = xyz[..., 0]
+    Y = xyz[..., 1]
+    Z = xyz[..., 2]
+    den = X + 15 * Y + 3 * Z
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, 4 * X / den, 0)
+
+
+def get_vp_ar(xyz):
+    xyz = float_ar(xyz)
+    X = xyz[..., 0]
+    Y = xyz[..., 1]
+    Z = xyz[..., 2]
+    den = X + 15 * Y + 3 * Z
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, 9 * Y / den, 0)
+
+
+def rgb_to_xyz_ar(rgb, dtype=None):
+    rgb = float_ar(rgb, dtype) / 255
+
+    # Assume sRGB (in place)
+    linear = rgb <= 0.04045
+    low = rgb[linear] / 12.92
+    rgb += 0.055
+    rgb /= 1.055
+    rgb **= 2.4
+    rgb[linear] = low
+    r = rgb[..., 0]
+    g = rgb[..., 1]
+    b = rgb[..., 2]
+
+    x = (r * 0.4124564) + (g * 0.3575761) + (b * 0.1804375)
+    y = (r * 0.2126729) + (g * 0.7151522) + (b * 0.072175)
+    z = (r * 0.0193339) + (g * 0.119192) + (b * 0.9503041)
+
+    return np.stack((x * 100, y * 100, z * 100), axis=-1)
+
+
+def xyz_to_rgb_ar(xyz):
+    xyz = float_ar(xyz)
+    x = xyz[..., 0] / 100
+    y = xyz[..., 1] / 100
+    z = xyz[..., 2] / 100
+
+    r = (x * 3.2404542) + (y * -1.5371385) + (z * -0.4985314)
+    g = (x * -0.969266) + (y * 1.8760108) + (z * 0.041556)
+    b = (x * 0.0556434) + (y * -0.2040259) + (z * 1.0572252)
+    rgb = np.stack((r, g, b), axis=-1)
+
+    # Assume sRGB (in place)
+    linear = ~(rgb > 0.0031308)
+    low = rgb[linear] * 12.92
+    with np.errstate(invalid='ignore'):
+        rgb **= 1.0 / 2.4
+    rgb *= 1.055
+    rgb -= 0.055
+    rgb[linear] = low
+
+    # min(max(0, c), 1) maps NaN to 0
+    rgb[np.isnan(rgb)] = 0
+    np.clip(rgb, 0, 1, out=rgb)
+    rgb *= 255
+
+    return rgb
+
+
+def xyz_to_luv_chroma_ar(xyz):
+    xyz = float_ar(xyz)
+    yr = xyz[..., 1] / WHITEREF[1]
+    up = get_up_ar(xyz)
+    vp = get_vp_ar(xyz)
+
+    with np.errstate(invalid='ignore'):
+        L = fmt_ar(np.where(yr > EPS, 116 * (yr ** (1 / 3)) - 16, K * yr))
+
+    return np.stack((L, up, vp), axis=-1)
+
+
+def luv_chroma_to_luv_gama_ar(luv_chroma):
+    luv_chroma = float_ar(luv_chroma)
+    L = luv_chroma[..., 0]
+    up = luv_chroma[..., 1]
+    vp = luv_chroma[..., 2]
+
+    upr = get_up(WHITEREF)
+    vpr = get_vp(WHITEREF)
+
+    u = 13 * L * (up - upr)
+    v = 13 * L * (vp - vpr)
+
+    return np.stack((L, u, v), axis=-1)
+
+
+def _luv_to_xyz_ar(L, u, v):
+    upr = get_up(WHITEREF)
+    vpr = get_vp(WHITEREF)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        Y = fmt_ar(np.where(L > K * EPS, ((L + 16) / 116) ** 3, L / K))
+
+        a = (1 / 3) * (((52 * L) / (u + 13 * L * upr)) - 1)
+        b = -5 * Y
+        c = -1 / 3
+        d = Y * (((39 * L) / (v + 13 * L * vpr)) - 5)
+
+        X = fmt_ar((d - b) / (a - c))
+        Z = fmt_ar(X * a + b)
+    return np.stack((X * 100, Y * 100, Z * 100), axis=-1)
+
+
+def luv_chroma_to_xyz_ar(luv):
+    luv = float_ar(luv)
+    upr = get_up(WHITEREF)
+    vpr = get_vp(WHITEREF)
+
+    L = luv[..., 0]
+    u = 13 * L * (luv[..., 1] - upr)
+    v = 13 * L * (luv[..., 2] - vpr)
+
+    return _luv_to_xyz_ar(L, u, v)
+
+
+def luv_gama_to_xyz_ar(luv_gama):
+    luv_gama = float_ar(luv_gama)
+    return _luv_to_xyz_ar(luv_gama[..., 0], luv_gama[..., 1], luv_gama[..., 2])
+
+
+def rgb_to_luv_chroma_ar(rgb, dtype=None):
+    return xyz_to_luv_chroma_ar(rgb_to_xyz_ar(rgb, dtype))
+
+
+def rgb_to_luv_gama_ar(rgb, dtype=None):
+    return luv_chroma_to_luv_gama_ar(rgb_to_luv_chroma_ar(rgb, dtype))
+
+
+def luv_chroma_to_rgb_ar(luv_chroma):
+    return xyz_to_rgb_ar(luv_chroma_to_xyz_ar(luv_chroma))
+
+
+def luv_gama_to_rgb_ar(luv_gama):
+    return xyz_to_rgb_ar(luv_gama_to_xyz_ar(luv_gama))
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def to_cube(lut, title='webicd'):
+    """
+    Writes a 3D lookup table in the Adobe/Resolve .cube format.
+
+    Args:
+        lut (np.ndarray): The (size, size, size, 3) uint8 table, indexed by [r, g, b].
+        title (str, optional): The TITLE of the file. Defaults to 'webicd'.
+    Returns:
+        str: The .cube file.
+    """
+    size = lut.shape[0]
+    # .cube lists the points with the red index varying fastest
+    points = np.transpose(lut, (2, 1, 0, 3)).reshape(-1, 3) / 255
+    lines = [f'TITLE "{title}"', f'LUT_3D_SIZE {size}',
+             'DOMAIN_MIN 0.0 0.0 0.0', 'DOMAIN_MAX 1.0 1.0 1.0']
+    lines.extend(f'{r:.6f} {g:.6f} {b:.6f}' for (r, g, b) in points)
+    return '\n'.join(lines) + '\n'
+
+
+def apply_lut(pixels, lut):
+    """
+    Applies a 3D lookup table to RGB pixels with trilinear interpolation, as a
+    client would. Only the grid points are recolored exactly, in between the
+    shifts of the neighbouring clusters are mixed (see the /lut route).
+
+    Args:
+        pixels (np.ndarray): The uint8 pixels, with the channels in the last axis.
+        lut (np.ndarray): The (size, size, size, 3) uint8 table, indexed by [r, g, b].
+    Returns:
+        np.ndarray: The uint8 recolored pixels.
+    """
+    size = lut.shape[0]
+    position = np.asarray(pixels, dtype=float) * ((size - 1) / 255)
+    low = np.minimum(np.floor(position).astype(np.intp), size - 2)
+    weight = position - low
+    output = np.zeros(position.shape[:-1] + (3,))
+    for dr in (0, 1):
+        for dg in (0, 1):
+            for db in (0, 1):
+                w = (weight[..., 0] if dr else 1 - weight[..., 0]) * \
+                    (weight[..., 1] if dg else 1 - weight[..., 1]) * \
+                    (weight[..., 2] if db else 1 - weight[..., 2])
+                output += w[..., np.newaxis] * lut[low[..., 0] + dr,
+                                                   low[..., 1] + dg,
+                                                   low[..., 2] + db]
+    return np.rint(output).astype(np.uint8)
@@ -1,34 +1,49 @@
 from distutils.util import execute
 
-from webicd.icd import differentiation
+import numpy as np
+from webicd.icd import CHUNK_SIZE, DiscriminationModel
 from .abstract import AbstractFindConfusionColorStrategy
 from igraph import Graph
 
 class GraphGenerator(AbstractFindConfusionColorStrategy):
 
-  def __init__(self, ellipse, confusion_point, luminances) -> None:
+  def __init__(self, ellipse, confusion_point, luminances, chunk_size=CHUNK_SIZE) -> None:
       self.ellipse = ellipse
       self.confusion_point = confusion_point
       self.luminances = luminances
+      self.chunk_size = chunk_size
+      self.model = DiscriminationModel(ellipse, confusion_point, luminances)
 
-  def execute(self, colors):
-    g = Graph()
+  def confusing_pairs(self, colors):
+    """
+    Finds the pairs of colors whose differentiation is at most 1, computing
+    the upper triangle of the differentiation matrix in blocks of rows.
+
+    Args:
+        colors (np.ndarray): The (N, 3) colors.
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (E, 2) pairs (i < j) and their differentiations.
+    """
+    n = len(colors)
+    rows = max(1, self.chunk_size // max(1, n))
+    edges = [np.empty((0, 2), dtype=int)]
+    diffs = [np.empty(0)]
+    for start in range(0, n, rows):
+      stop = min(start + rows, n)
+      block = self.model.differentiation_matrix(
+        colors[start:stop], colors[start:], chunk_size=self.chunk_size)
+      # a pair is told apart when its differentiation is above 1, as in
+      # DiscriminationModel.differentiation_all, so 1 itself is confusing
+      i, j = np.nonzero(np.triu(block <= 1, 1))
+      edges.append(np.stack((i + start, j + start), axis=-1))
+      diffs.append(block[i, j])
+    return np.concatenate(edges), np.concatenate(diffs)
 
-    for i in range(len(colors)):
-      g.add_vertices([i])
+  def execute(self, colors):
+    edges, diffs = self.confusing_pairs(np.asarray(colors, dtype=float).reshape(-1, 3))
 
+    g = Graph(n=len(colors), edges=edges.tolist())
     g.vs["color"] = colors
+    g.es["diff"] = diffs.tolist()
 
-    for i in range(len(colors)):
-      for j in range(i, len(colors)):
-        if i != j:
-          diff = differentiation(
-            self.ellipse, 
-            self.confusion_point, 
-            self.luminances, 
-            colors[i], colors[j]
-          )
-          if diff <= 1: # TODO ?
-            g.add_edges([(i,j)])
-            
-    return g
\ No newline at end of file
+    return g
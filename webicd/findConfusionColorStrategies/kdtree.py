@@ -0,0 +1,34 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from .graph import GraphGenerator
+
+class KDTreeGraphGenerator(GraphGenerator):
+  """
+  Builds the same graph as GraphGenerator without the all-pairs loop.
+
+  The differentiation is the Euclidean distance after the fixed linear
+  DiscriminationModel.transform, so the confusing pairs (diff <= 1) are the
+  pairs within radius 1 of each other in the transformed space.
+  """
+
+  def confusing_pairs(self, colors):
+    """
+    Finds the pairs of colors whose differentiation is at most 1 with a KD-tree ball query.
+
+    Args:
+        colors (np.ndarray): The (N, 3) colors.
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (E, 2) pairs (i < j) and their differentiations.
+    """
+    if len(colors) == 0:
+      return np.empty((0, 2), dtype=int), np.empty(0)
+
+    points = self.model.transform(colors)
+    # slightly larger radius, the exact comparison is done below
+    pairs = cKDTree(points).query_pairs(1 + 1e-9, output_type='ndarray')
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    d = points[pairs[:, 0]] - points[pairs[:, 1]]
+    diffs = np.sqrt(np.einsum('ij,ij->i', d, d))
+    confusing = diffs <= 1
+    return pairs[confusing], diffs[confusing]
@@ -0,0 +1,147 @@
+from functools import lru_cache
+
+import numpy as np
+
+from webicd.convert import WHITEREF, luv_chroma_to_xyz_ar, luv_gama_to_xyz_ar
+
+# Default (L, u, v) bounds of each Luv representation. The chroma bounds are the
+# ones sampled by random_luv_chroma and the gama ones cover the sRGB gamut.
+BOUNDS = {
+    'chroma': ((0, 100), (0, 0.7), (0, 0.6)),
+    'gama': ((0, 100), (-100, 200), (-150, 150)),
+}
+
+TO_XYZ = {
+    'chroma': luv_chroma_to_xyz_ar,
+    'gama': luv_gama_to_xyz_ar,
+}
+
+
+def is_visible_xyz(xyz):
+    """
+    Checks if XYZ colors are inside the D65 white reference box.
+
+    Args:
+        xyz (np.ndarray): The colors, with the channels in the last axis.
+    Returns:
+        np.ndarray: True for the visible colors.
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    return np.all((0 <= xyz) & (xyz <= WHITEREF), axis=-1)
+
+
+class Gamut:
+    """
+    Voxel occupancy grid of the visible colors in a Luv representation.
+
+    A cell is marked inside when its 8 corners are visible. At a fixed
+    luminance the visible region is convex in (u', v'), so samples drawn from
+    inside cells are visible; the few that are not (near the border in the gama
+    representation) are redrawn.
+    """
+
+    def __init__(self, space='chroma', bounds=None, resolution=(100, 64, 64)) -> None:
+        """
+        Builds the occupancy grid.
+
+        Args:
+            space (str, optional): Either 'chroma' or 'gama'. Defaults to 'chroma'.
+            bounds (tuple, optional): The (low, high) bounds of each channel. Defaults to BOUNDS[space].
+            resolution (tuple[int, int, int], optional): The number of cells of each channel. Defaults to (100, 64, 64).
+        Returns:
+            None
+        """
+        self.space = space
+        self.to_xyz = TO_XYZ[space]
+        self.bounds = np.asarray(BOUNDS[space] if bounds is None else bounds,
+                                 dtype=float)
+        self.resolution = np.asarray(resolution)
+        self.step = (self.bounds[:, 1] - self.bounds[:, 0]) / self.resolution
+
+        axes = [np.linspace(low, high, n + 1)
+                for ((low, high), n) in zip(self.bounds, self.resolution)]
+        corners = self.contains(
+            np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1))
+        inside = np.ones(tuple(self.resolution), dtype=bool)
+        for dL in (0, 1):
+            for du in (0, 1):
+                for dv in (0, 1):
+                    inside &= corners[dL:dL + self.resolution[0],
+                                      du:du + self.resolution[1],
+                                      dv:dv + self.resolution[2]]
+        self.inside = inside
+        self.cells = np.flatnonzero(inside)
+
+    def contains(self, luv):
+        """
+        Checks if Luv colors are visible.
+
+        Args:
+            luv (np.ndarray): The colors, with the channels in the last axis.
+        Returns:
+            np.ndarray: True for the visible colors.
+        """
+        return is_visible_xyz(self.to_xyz(luv))
+
+    def _draw(self, size, rng, luminance):
+        if luminance is None:
+            cells = self.cells
+        else:
+            index = int(np.clip((luminance - self.bounds[0, 0]) // self.step[0],
+                                0, self.resolution[0] - 1))
+            cells = np.flatnonzero(self.inside[index]) + \
+                index * self.resolution[1] * self.resolution[2]
+        if len(cells) == 0:
+            # no cell is fully visible, draw from the whole box
+            colors = rng.uniform(self.bounds[:, 0], self.bounds[:, 1], (size, 3))
+        else:
+            cells = np.stack(np.unravel_index(
+                rng.choice(cells, size), tuple(self.resolution)), axis=-1)
+            colors = self.bounds[:, 0] + \
+                (cells + rng.random((size, 3))) * self.step
+        if luminance is not None:
+            colors[:, 0] = luminance
+        return colors
+
+    def sample(self, size, rng=None, luminance=None, max_tries=100):
+        """
+        Draws visible colors.
+
+        Args:
+            size (int): The number of colors.
+            rng (np.random.Generator, optional): The random generator. Defaults to a new one.
+            luminance (float, optional): Fixes the luminance of the colors. Defaults to None.
+            max_tries (int, optional): The maximum number of redraws of invisible colors, the ones still
+                invisible then are replaced by visible colors of the same draw. Defaults to 100.
+        Returns:
+            np.ndarray: The (size, 3) colors.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        colors = self._draw(size, rng, luminance)
+        invisible = np.flatnonzero(~self.contains(colors))
+        tries = 0
+        while len(invisible) > 0 and tries < max_tries:
+            colors[invisible] = self._draw(len(invisible), rng, luminance)
+            invisible = invisible[~self.contains(colors[invisible])]
+            tries += 1
+        if len(invisible) > 0:
+            visible = np.setdiff1d(np.arange(size), invisible)
+            if len(visible) == 0:
+                raise ValueError('No visible color found in the gamut bounds'
+                                 + ('' if luminance is None else f' at luminance {luminance}'))
+            colors[invisible] = colors[rng.choice(visible, len(invisible))]
+        return colors
+
+
+@lru_cache(maxsize=None)
+def get_gamut(space='chroma', bounds=None):
+    """
+    Returns the gamut of a Luv representation, built once per process.
+
+    Args:
+        space (str, optional): Either 'chroma' or 'gama'. Defaults to 'chroma'.
+        bounds (tuple, optional): The (low, high) bounds of each channel, as tuples. Defaults to BOUNDS[space].
+    Returns:
+        Gamut: The gamut.
+    """
+    return Gamut(space, bounds)
@@ -1,43 +1,51 @@
-from webicd.convert import rgb_to_luv_gama, convert_ar
 from webicd.getColorStrategies.abstract import AbstractGetColorStrategy
-from webicd.utils import get_colors
+from webicd.tables import rgb_to_luv_gama_lut
+from webicd.utils import get_colors_histogram, resize_to_budget
 import numpy as np
-import scipy.cluster
-import sklearn.cluster
 
 
 class Cluster(AbstractGetColorStrategy):
-    def __init__(self, model, resize=False, maxColors=10000) -> None:
+    def __init__(self, model, resize=False, maxColors=10000, weighted=True,
+                 dtype=np.float64) -> None:
+        """
+        Clusters the distinct colors of the image.
+
+        Args:
+            model (sklearn.cluster.KMeans | sklearn.cluster.MiniBatchKMeans): The clustering model.
+            resize (bool | int, optional): The pixel budget the image is first downsampled to, keeping its aspect ratio, True for 150x150. Defaults to False.
+            maxColors (int, optional): The maximum number of distinct colors to cluster. Defaults to 10000.
+            weighted (bool, optional): Whether to weight each color by its pixel count. Defaults to True.
+            dtype (np.dtype, optional): The dtype the distinct colors are clustered in, the model is fitted in it. Defaults to np.float64.
+        Returns:
+            None
+        """
         self.model = model
         self.resize = resize
         self.maxColors = maxColors
+        self.weighted = weighted
+        self.dtype = dtype
 
     def execute(self, image):
         if self.resize:
-            image = image.resize((150, 150))      # optional, to reduce time
+            # optional, to reduce time
+            image = resize_to_budget(
+                image, 150 * 150 if self.resize is True else self.resize)
 
-        colors = get_colors(image, self.maxColors)
-        colors = np.asarray(convert_ar(colors, rgb_to_luv_gama))
-        colors = colors[~np.isnan(colors).any(axis=1), :]
-        ar = np.asarray(colors)
+        colors, counts, _index = get_colors_histogram(image, self.maxColors)
+        colors = rgb_to_luv_gama_lut(colors, self.dtype)
+        valid = ~np.isnan(colors).any(axis=1)
+        colors = colors[valid, :]
+        counts = counts[valid] if self.weighted else np.ones(valid.sum())
 
-        model = self.model.fit(ar)
+        model = self.model.fit(colors, sample_weight=counts)
         codes = model.cluster_centers_
-        vecs, _dist = scipy.cluster.vq.vq(ar, codes)   # assign codes
-        counts, _bins = np.histogram(vecs, len(codes))  # count occurrences
+
+        # order the clusters by the number of pixels they hold
+        sizes = np.bincount(model.labels_, weights=counts,
+                            minlength=len(codes))
 
         colors = []
-        for index in np.argsort(counts)[::-1]:
+        for index in np.argsort(sizes)[::-1]:
             colors.append(tuple([code for code in codes[index]]))
 
-        # join labels
-        labels = model.labels_
-        labels = list(
-            map(
-                lambda index: tuple([code for code in codes[index]]),
-                labels
-            )
-        )
-        labeled = list(zip(ar, labels))
-
         return colors
@@ -0,0 +1,241 @@
+from PIL import Image
+from webicd.convert import float_ar, luv_gama_to_rgb_ar
+from webicd.getColorStrategies.abstract import AbstractGetColorStrategy
+from webicd.tables import rgb_to_luv_gama_lut
+from webicd.utils import get_colors_histogram
+import numpy as np
+
+
+def pack_rgb(rgb):
+    """
+    Packs (N, 3) uint8 RGB colors into (N,) integers.
+    """
+    rgb = np.asarray(rgb)
+    return (rgb[:, 0].astype(np.uint32) << 16) | \
+        (rgb[:, 1].astype(np.uint32) << 8) | rgb[:, 2]
+
+
+def lookup(keys, values, queries):
+    """
+    Finds queries in the sorted keys.
+
+    Args:
+        keys (np.ndarray): The (k,) sorted keys.
+        values (np.ndarray): The (k,) value of each key.
+        queries (np.ndarray): The (N,) queries.
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (N,) values, and the (N,) mask of the queries found
+            (the values of the others are undefined).
+    """
+    if len(keys) == 0:
+        return np.zeros(len(queries), dtype=values.dtype), np.zeros(len(queries), dtype=bool)
+    position = np.minimum(np.searchsorted(keys, queries), len(keys) - 1)
+    return values[position], keys[position] == queries
+
+
+class Quantize(AbstractGetColorStrategy):
+    """
+    Base class of the palette quantizers.
+
+    After execute, a quantizer can be passed to RecolorCluster in place of the
+    sklearn model: it exposes the palette in `cluster_centers_`, a `predict`
+    assigning colors as the quantizer assigned the pixels and, for the image it
+    quantized, the palette index of each pixel in `pixel_labels_`.
+    """
+
+    def predict(self, X):
+        """
+        Assigns each Luv color to a palette color, the nearest one unless the
+        quantizer assigns them otherwise.
+
+        Args:
+            X (np.ndarray): The (N, 3) Luv colors.
+        Returns:
+            np.ndarray: The (N,) palette indexes.
+        """
+        return self.nearest(X)
+
+    def nearest(self, X, chunk_size=2 ** 18):
+        """
+        Assigns each Luv color to the nearest palette color.
+
+        Args:
+            X (np.ndarray): The (N, 3) Luv colors.
+            chunk_size (int, optional): The maximum number of distances computed at once. Defaults to 2 ** 18.
+        Returns:
+            np.ndarray: The (N,) palette indexes.
+        """
+        X = float_ar(X)
+        centers = self.cluster_centers_.astype(X.dtype, copy=False)
+        rows = max(1, chunk_size // len(centers))
+        labels = np.empty(len(X), dtype=np.intp)
+        for start in range(0, len(X), rows):
+            d = X[start:start + rows, np.newaxis, :] - \
+                centers[np.newaxis, :, :]
+            labels[start:start + rows] = np.argmin(
+                np.einsum('ijk,ijk->ij', d, d), axis=1)
+        return labels
+
+    def set_palette(self, image, centers, pixel_labels):
+        """
+        Keeps the used palette colors, most frequent first, and returns them.
+
+        Args:
+            image (PIL.Image): The quantized image.
+            centers (np.ndarray): The (k, 3) Luv palette.
+            pixel_labels (np.ndarray): The (w*h,) palette index of each pixel.
+        Returns:
+            list[tuple[float, float, float]]: The palette colors.
+        """
+        counts = np.bincount(pixel_labels, minlength=len(centers))
+        order = np.argsort(counts)[::-1]
+        order = order[counts[order] > 0]
+        index = np.full(len(centers), -1, dtype=np.intp)
+        index[order] = np.arange(len(order))
+
+        # the index of each palette color in centers
+        self.center_index_ = order
+        self.cluster_centers_ = np.asarray(centers, dtype=float)[order]
+        self.pixel_labels_ = index[pixel_labels]
+        self.image_size_ = image.size
+        return [tuple(center) for center in self.cluster_centers_]
+
+
+class PillowQuantize(Quantize):
+    def __init__(self, n_colors=16, method=Image.Quantize.MEDIANCUT) -> None:
+        """
+        Quantizes the image with Pillow's median cut or octree quantizers.
+
+        Args:
+            n_colors (int, optional): The number of colors. Defaults to 16.
+            method (PIL.Image.Quantize, optional): Either MEDIANCUT or FASTOCTREE. Defaults to MEDIANCUT.
+        Returns:
+            None
+        """
+        self.n_colors = n_colors
+        self.method = method
+
+    def predict(self, X):
+        """
+        Assigns each Luv color to a palette color as Pillow does: the colors of
+        the quantized image get the palette color of their pixels, the others
+        the one Pillow maps them to (the nearest in RGB).
+
+        Args:
+            X (np.ndarray): The (N, 3) Luv colors.
+        Returns:
+            np.ndarray: The (N,) palette indexes.
+        """
+        rgb = np.clip(np.rint(luv_gama_to_rgb_ar(np.asarray(X, dtype=float))),
+                      0, 255).astype(np.uint8).reshape(-1, 3)
+        labels, seen = lookup(self.colors_, self.color_labels_, pack_rgb(rgb))
+        other = np.flatnonzero(~seen)
+        if len(other) > 0:
+            # padded with the first color, so that no other entry is matched
+            palette = np.concatenate(
+                (self.palette_, np.repeat(self.palette_[:1], 256 - len(self.palette_), axis=0)))
+            palette_image = Image.new('P', (1, 1))
+            palette_image.putpalette(palette.reshape(-1).tolist())
+            quantized = Image.fromarray(rgb[other].reshape(-1, 1, 3)).quantize(
+                palette=palette_image, dither=Image.Dither.NONE)
+            index = np.asarray(quantized).reshape(-1).astype(np.intp)
+            labels[other] = np.where(index < len(self.palette_), index, 0)
+        return labels
+
+    def execute(self, image):
+        quantized = image.convert('RGB').quantize(
+            colors=self.n_colors, method=self.method, dither=Image.Dither.NONE)
+        palette = np.asarray(quantized.getpalette(), dtype=np.uint8)
+        palette = palette[:len(palette) // 3 * 3].reshape(-1, 3)
+        pixel_labels = np.asarray(quantized).reshape(-1).astype(np.intp)
+        colors = self.set_palette(image, rgb_to_luv_gama_lut(palette), pixel_labels)
+
+        # the RGB palette and the palette index of each color of the image
+        self.palette_ = palette[self.center_index_]
+        (self.colors_, first) = np.unique(
+            pack_rgb(np.asarray(image.convert('RGB')).reshape(-1, 3)), return_index=True)
+        self.color_labels_ = self.pixel_labels_[first]
+        return colors
+
+
+class GridQuantize(Quantize):
+    def __init__(self, n_colors=None, step=(10, 20, 20)) -> None:
+        """
+        Quantizes the image on a regular Luv grid. Each occupied cell is one
+        palette color (the mean of its pixels) or, beyond n_colors, only the
+        cells holding the most pixels are, the others joining the one with the
+        nearest mean.
+
+        Args:
+            n_colors (int, optional): The maximum number of colors, every occupied cell if None. Defaults to None.
+            step (tuple[float, float, float], optional): The cell size in Luv units. Defaults to (10, 20, 20).
+        Returns:
+            None
+        """
+        self.n_colors = n_colors
+        self.step = step
+
+    def cells(self, luv):
+        return np.floor(np.asarray(luv, dtype=float) / np.asarray(self.step)).astype(np.int64)
+
+    def cell_keys(self, cells):
+        # packs the cells inside the bounds of the occupied cells, -1 outside
+        low = self.cells_.min(axis=0)
+        span = self.cells_.max(axis=0) - low + 1
+        offset = cells - low
+        keys = (offset[:, 0] * span[1] + offset[:, 1]) * span[2] + offset[:, 2]
+        inside = np.all((offset >= 0) & (offset < span), axis=1)
+        return np.where(inside, keys, -1)
+
+    def predict(self, X):
+        """
+        Assigns each Luv color to the palette color of its cell, or to the
+        nearest palette color when the image had no color in the cell.
+
+        Args:
+            X (np.ndarray): The (N, 3) Luv colors.
+        Returns:
+            np.ndarray: The (N,) palette indexes.
+        """
+        keys = self.cell_keys(self.cells(X).reshape(-1, 3))
+        cell_keys = self.cell_keys(self.cells_)
+        order = np.argsort(cell_keys)
+        labels, found = lookup(cell_keys[order], self.cell_labels_[order], keys)
+        found &= keys >= 0
+        other = np.flatnonzero(~found)
+        if len(other) > 0:
+            labels[other] = self.nearest(float_ar(X)[other])
+        return labels
+
+    def execute(self, image):
+        colors, counts, index = get_colors_histogram(image)
+        luv = rgb_to_luv_gama_lut(colors)
+
+        cells, cell_labels = np.unique(self.cells(luv), axis=0, return_inverse=True)
+        cell_labels = cell_labels.reshape(-1)
+
+        # count-weighted mean of the colors of each cell
+        weights = np.bincount(cell_labels, weights=counts)
+        means = np.stack([np.bincount(cell_labels, weights=counts * luv[:, k])
+                          for k in range(3)], axis=-1) / weights[:, np.newaxis]
+
+        # the center of each cell, the cells beyond n_colors joining the kept
+        # cell with the nearest mean
+        cell_centers = np.arange(len(cells))
+        if self.n_colors is not None and len(cells) > self.n_colors:
+            kept = np.argsort(weights, kind='stable')[::-1][:max(1, self.n_colors)]
+            d = means[:, np.newaxis, :] - means[np.newaxis, kept, :]
+            cell_centers = np.argmin(np.einsum('ijk,ijk->ij', d, d), axis=1)
+            cell_centers[kept] = np.arange(len(kept))
+        # count-weighted mean of the colors of each center
+        center_weights = np.bincount(cell_centers, weights=weights)
+        centers = np.stack([np.bincount(cell_centers, weights=weights * means[:, k])
+                            for k in range(3)], axis=-1) / center_weights[:, np.newaxis]
+
+        colors = self.set_palette(image, centers, cell_centers[cell_labels[index]])
+        # the occupied cells and the palette color of each
+        palette_index = np.empty(len(centers), dtype=np.intp)
+        palette_index[self.center_index_] = np.arange(len(self.center_index_))
+        self.cells_ = cells
+        self.cell_labels_ = palette_index[cell_centers]
+        return colors
@@ -1,7 +1,149 @@
 import numpy as np
 import math
 
-from webicd.utils import sigmoid
+# Maximum number of color pairs evaluated at once by the batched methods
+CHUNK_SIZE = 2 ** 18
+
+
+class DiscriminationModel:
+    """
+    Color discrimination model of a user, built once from the calibration.
+
+    The differentiation of two colors is what utils.sigmoid computes: the
+    distance between them over the distance to the ellipsoid surface in the
+    same direction. Since the ellipsoid is centered on the first color, that
+    ratio is the norm of the difference after rotating (u, v) by the ellipse
+    angle and scaling each axis by its semi-axis:
+    sqrt(L^2 / c^2 + u'^2 / a^2 + v'^2 / b^2).
+    """
+
+    def __init__(self, ellipse, confusion_point, luminances) -> None:
+        """
+        Precomputes the rotation and the ellipsoid semi-axes.
+
+        Args:
+            ellipse (dict): The ellipse parameters.
+            confusion_point (list[float]): The confusion point.
+            luminances (dict): The luminances.
+        Returns:
+            None
+        """
+        self.ellipse = ellipse
+        self.confusion_point = confusion_point
+        self.luminances = luminances
+
+        angle = np.radians(90. - np.rad2deg(ellipse['phi']))
+        self.cos_angle = float(np.cos(angle))
+        self.sin_angle = float(np.sin(angle))
+
+        self.a = ellipse['width']
+        self.b = ellipse['height']
+        self.c = (luminances['top'] - luminances['bottom']) / 2
+        with np.errstate(divide='ignore'):
+            [self.inv_a2, self.inv_b2, self.inv_c2] = map(
+                float, 1 / np.square(np.array([self.a, self.b, self.c], dtype=float)))
+
+    def differentiation(self, color1, color2):
+        """
+        Calculates the differentiation between two colors.
+
+        Args:
+            color1 (list[float]): The first color.
+            color2 (list[float]): The second color.
+        Returns:
+            float: The differentiation, 0 for equal colors.
+        """
+        lc = color2[0] - color1[0]
+        uc = color2[1] - color1[1]
+        vc = color2[2] - color1[2]
+        if lc == 0 and uc == 0 and vc == 0:
+            return 0
+        uct = uc * self.cos_angle - vc * self.sin_angle
+        vct = uc * self.sin_angle + vc * self.cos_angle
+        return math.sqrt(lc * lc * self.inv_c2 + uct * uct * self.inv_a2 + vct * vct * self.inv_b2)
+
+    def transform(self, colors):
+        """
+        Maps Luv colors to the space where the differentiation is the Euclidean distance.
+
+        Args:
+            colors (np.ndarray): The colors, with the channels in the last axis.
+        Returns:
+            np.ndarray: The transformed colors.
+        """
+        colors = np.asarray(colors, dtype=float)
+        L = colors[..., 0]
+        u = colors[..., 1]
+        v = colors[..., 2]
+        return np.stack((
+            L * math.sqrt(self.inv_c2),
+            (u * self.cos_angle - v * self.sin_angle) * math.sqrt(self.inv_a2),
+            (u * self.sin_angle + v * self.cos_angle) * math.sqrt(self.inv_b2)
+        ), axis=-1)
+
+    def _reduce(self, colors1, colors2, reduce, chunk_size):
+        """
+        Applies reduce to blocks of rows of the differentiation matrix.
+
+        Args:
+            colors1 (np.ndarray): The (N, 3) or (3,) colors of the rows.
+            colors2 (np.ndarray): The (M, 3) colors of the columns.
+            reduce (callable): Maps an (n, M) block to n values.
+            chunk_size (int): The maximum number of pairs in a block.
+        Returns:
+            np.ndarray | float: The N reduced values, or one for a single color.
+        """
+        single = np.ndim(colors1) == 1
+        t1 = self.transform(np.atleast_2d(colors1))
+        t2 = self.transform(np.reshape(colors2, (-1, 3)))
+        rows = max(1, chunk_size // max(1, len(t2)))
+        out = []
+        for start in range(0, len(t1), rows):
+            d = t1[start:start + rows, np.newaxis, :] - t2[np.newaxis, :, :]
+            out.append(reduce(np.sqrt(np.einsum('ijk,ijk->ij', d, d))))
+        out = np.concatenate(out) if out else reduce(np.empty((0, len(t2))))
+        return out[0] if single else out
+
+    def differentiation_matrix(self, colors1, colors2, chunk_size=CHUNK_SIZE):
+        """
+        Calculates the differentiation between every pair of colors.
+
+        Args:
+            colors1 (np.ndarray): The (N, 3) colors.
+            colors2 (np.ndarray): The (M, 3) colors.
+            chunk_size (int, optional): The maximum number of pairs in a block. Defaults to CHUNK_SIZE.
+        Returns:
+            np.ndarray: The (N, M) differentiation matrix.
+        """
+        return self._reduce(colors1, colors2, lambda block: block, chunk_size)
+
+    def differentiation_mean(self, colors1, colors2, chunk_size=CHUNK_SIZE):
+        """
+        Calculates the mean differentiation of each color against an array of colors.
+
+        Returns:
+            np.ndarray | float: The (N,) means, or one mean for a single color.
+        """
+        return self._reduce(colors1, colors2, lambda block: np.mean(block, axis=1), chunk_size)
+
+    def differentiation_min(self, colors1, colors2, chunk_size=CHUNK_SIZE):
+        """
+        Calculates the minimum differentiation of each color against an array of colors.
+
+        Returns:
+            np.ndarray | float: The (N,) minimums, or one for a single color.
+        """
+        return self._reduce(colors1, colors2,
+                            lambda block: np.min(block, axis=1, initial=np.inf), chunk_size)
+
+    def differentiation_all(self, colors1, colors2, chunk_size=CHUNK_SIZE):
+        """
+        Checks, for each color, if its differentiation to every color of an array is greater than 1.
+
+        Returns:
+            np.ndarray | bool: The (N,) checks, or one for a single color.
+        """
+        return self._reduce(colors1, colors2, lambda block: np.all(block > 1, axis=1), chunk_size)
 
 
 def differentiation(
@@ -17,7 +159,7 @@ def differentiation(
     #         (confusion_point[0] - u)
     #     ) + math.pi / 2
     # ellipse['phi']  = transformed_ellipse_angle
-    return sigmoid(color1, color2, ellipse, luminances)
+    return DiscriminationModel(ellipse, confusion_point, luminances).differentiation(color1, color2)
     # luminance_distance = (luminances['top'] - luminances['bottom']) / 2
     # color1Luminance = color1[0]
     # color2Luminance = color2[0]
@@ -60,7 +202,8 @@ def differentiantion_ar(
     Returns:
        Boolean  
     """
-    return all(map(lambda x: differentiation(ellipse, confusion_point, luminances, color, x) > 1, ar))
+    model = DiscriminationModel(ellipse, confusion_point, luminances)
+    return bool(model.differentiation_all(color, ar))
 
 
 def ellipse_contains(ellipse, point):
@@ -88,12 +231,5 @@ def differentiantion_mean(
     color,
     ar
 ):
-    return np.mean(
-        list(
-            map(
-                lambda x: differentiation(
-                    ellipse, confusion_point, luminances, color, x),
-                ar
-            )
-        )
-    )
+    model = DiscriminationModel(ellipse, confusion_point, luminances)
+    return model.differentiation_mean(color, ar)
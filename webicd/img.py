@@ -8,14 +8,120 @@ from webicd.recolor import Recolor
 from webicd.recolorStrategies.cluster import RecolorCluster
 from webicd.recolorConfusionColorStrategies.genetic import GeneticRecolor
 from webicd.recolorConfusionColorStrategies.random import RandomRecolor
-from webicd.findConfusionColorStrategies.graph import GraphGenerator
+from webicd.findConfusionColorStrategies.kdtree import KDTreeGraphGenerator
 from webicd.getColorStrategies.cluster import Cluster
+from webicd.getColorStrategies.quantize import GridQuantize, PillowQuantize
+from webicd.utils import resize_to_budget
 
 import matplotlib.pyplot as plt
+import numpy as np
 import sklearn.cluster
 
 
-def recolor_image(image_name, algorithm, ellipse, confusion_point, luminances):
+PALETTES = ('kmeans', 'mediancut', 'octree', 'grid')
+
+
+def get_palette_strategy(palette, n_clusters, minibatch=False, dtype=np.float64):
+    """
+    Creates the strategy that extracts the palette of the image.
+
+    Args:
+        palette (str): One of PALETTES.
+        n_clusters (int): The number of palette colors ('grid' may find fewer).
+        minibatch (bool, optional): Whether 'kmeans' uses MiniBatchKMeans. Defaults to False.
+        dtype (np.dtype, optional): The dtype 'kmeans' clusters the colors in. Defaults to np.float64.
+
+    Returns:
+        tuple[AbstractGetColorStrategy, object]: The strategy and the model used by RecolorCluster.
+    """
+    if palette == 'kmeans':
+        if minibatch:
+            model = sklearn.cluster.MiniBatchKMeans(
+                n_clusters=n_clusters, random_state=1)
+        else:
+            model = sklearn.cluster.KMeans(
+                n_clusters=n_clusters, random_state=1)
+        return Cluster(model, resize=False, maxColors=20000, dtype=dtype), model
+    elif palette == 'mediancut':
+        quantize = PillowQuantize(n_clusters, Image.Quantize.MEDIANCUT)
+    elif palette == 'octree':
+        quantize = PillowQuantize(n_clusters, Image.Quantize.FASTOCTREE)
+    elif palette == 'grid':
+        quantize = GridQuantize(n_clusters)
+    else:
+        raise ValueError(f'Unknown palette strategy: {palette}')
+    # quantizers act as their own model
+    return quantize, quantize
+
+def load_image(image_name):
+    """
+    Loads one of the original images.
+
+    Args:
+        image_name (str): The name of the image.
+
+    Returns:
+        PIL.Image: The RGB image.
+    """
+    image_dir = pathlib.Path('images')
+
+    return Image.open(image_dir.joinpath(
+        f'{image_name}-original.png')).convert('RGB')
+
+
+def get_recolor_algorithm(image, algorithm, ellipse, confusion_point, luminances, minibatch=False,
+                          palette='kmeans', tile_rows=None, n_jobs=None, dtype=np.float64,
+                          max_pixels=None, ga_jobs=None, ga_options=None):
+    """
+    Creates one of the two recolor algorithms for an image.
+    Args:
+        image (PIL.Image): The image to recolor.
+        algorithm (str): The algorithm to use. Either 'tcc' or 'original'.
+        ellipse (dict): The ellipse parameters.
+        confusion_point (dict): The confusion point parameters.
+        luminances (list): The luminance values.
+        minibatch (bool, optional): Whether to cluster with MiniBatchKMeans instead of KMeans. Defaults to False.
+        palette (str, optional): The palette strategy, one of PALETTES. Defaults to 'kmeans'.
+        tile_rows (int, optional): The number of rows recolored at once, all of them if None. Defaults to None.
+        n_jobs (int, optional): The number of threads recoloring the image. Defaults to None (1).
+        dtype (np.dtype, optional): The dtype of the Luv colors, np.float32 lowers the peak memory of the recolor by about a quarter (see memory_benchmark.py). Defaults to np.float64.
+        max_pixels (int, optional): The pixel budget of the thumbnail the palette is found on, the full image if None. Defaults to None.
+        ga_jobs (int, optional): The number of processes running the 'tcc' genetic algorithms. Defaults to None (1).
+        ga_options (dict, optional): More GeneticRecolor options, e.g. its store or stopping criteria. Defaults to None.
+
+    Returns:
+        Recolor: The recolor algorithm.
+    """
+    # creates the palette strategy (and its model) used in both, sized for the
+    # image it is found on
+    pixels = image.size[0] * image.size[1]
+    if max_pixels is not None:
+        pixels = min(pixels, max_pixels)
+    n_clusters = max(1, int(log(max(pixels, 1))))
+    (get_color_strategy, model_tcc) = get_palette_strategy(
+        palette, n_clusters, minibatch, dtype)
+
+    if algorithm == 'tcc':
+        # creates the tcc recolor algorithm
+        recolor_confusion_color_strategy = GeneticRecolor(
+            ellipse, confusion_point, luminances, random_state=1, n_jobs=ga_jobs,
+            **(ga_options or {}))
+    else:
+        # creates the original recolor algorithm
+        recolor_confusion_color_strategy = RandomRecolor(
+            ellipse, confusion_point, luminances, random_state=1)
+
+    return Recolor(
+        get_color_strategy,
+        KDTreeGraphGenerator(ellipse, confusion_point, luminances),
+        recolor_confusion_color_strategy,
+        RecolorCluster(model_tcc, tile_rows=tile_rows,
+                       n_jobs=n_jobs, dtype=dtype),
+        analysis_pixels=max_pixels
+    )
+
+
+def recolor_image(image_name, algorithm, ellipse, confusion_point, luminances, **kwargs):
     """
     Recolors an image using one of the two algorithms.
     Args:
@@ -24,47 +130,68 @@ def recolor_image(image_name, algorithm, ellipse, confusion_point, luminances):
         ellipse (dict): The ellipse parameters.
         confusion_point (dict): The confusion point parameters.
         luminances (list): The luminance values.
+        **kwargs: The options of get_recolor_algorithm.
 
     Returns:
         PIL.Image: The recolored image.
     """
-    image_dir = pathlib.Path('images')
+    image = load_image(image_name)
+    recolor_algorithm = get_recolor_algorithm(
+        image, algorithm, ellipse, confusion_point, luminances, **kwargs)
 
-    image = Image.open(image_dir.joinpath(
-        f'{image_name}-original.png')).convert('RGB')
+    (new_image, color_dict) = recolor_algorithm.execute(image)
+    return Image.fromarray(new_image)
 
-    # creates the kmeans model used in both
-    n_clusters = int(log(image.size[0] * image.size[1]))
-    model_tcc = sklearn.cluster.KMeans(
-        n_clusters=n_clusters, random_state=1)
 
-    if algorithm == 'tcc':
-        # creates the tcc recolor algorithm
-        recolor_algorithm_tcc = Recolor(
-            Cluster(model_tcc, resize=False, maxColors=20000),
-            GraphGenerator(ellipse, confusion_point, luminances),
-            GeneticRecolor(ellipse, confusion_point,
-                           luminances, random_state=1),
-            RecolorCluster(model_tcc)
-        )
-
-        # save image with tcc colors
-        (tcc_image, color_dict) = recolor_algorithm_tcc.execute(image)
-        tcc_image = Image.fromarray(tcc_image)
-        # tcc_image_bytes = tcc_image.tobytes()
-        return tcc_image
-    else:
-        # creates the original recolor algorithm
-        recolor_algorithm_original = Recolor(
-            Cluster(model_tcc, resize=False, maxColors=20000),
-            GraphGenerator(ellipse, confusion_point, luminances),
-            RandomRecolor(ellipse, confusion_point,
-                          luminances, random_state=1),
-            RecolorCluster(model_tcc)
-        )
-
-        # save image with original recolor colors
-        (original_image, color_dict) = recolor_algorithm_original.execute(image)
-        original_image = Image.fromarray(original_image)
-        # original_image = original_image.tobytes()
-        return original_image
+def recolor_image_progressive(image_name, algorithm, ellipse, confusion_point, luminances,
+                              preview_pixels=256 * 256, **kwargs):
+    """
+    Recolors an image, first yielding a low resolution preview recolored as
+    soon as the new palette colors are found, then the full resolution image.
+    Args:
+        image_name (str): The name of the image to recolor.
+        algorithm (str): The algorithm to use. Either 'tcc' or 'original'.
+        ellipse (dict): The ellipse parameters.
+        confusion_point (dict): The confusion point parameters.
+        luminances (list): The luminance values.
+        preview_pixels (int, optional): The pixel budget of the preview. Defaults to 256 * 256.
+        **kwargs: The options of get_recolor_algorithm.
+
+    Yields:
+        tuple[str, PIL.Image]: ('preview', image), skipped when the image fits preview_pixels, and then ('final', image).
+    """
+    image = load_image(image_name)
+    recolor_algorithm = get_recolor_algorithm(
+        image, algorithm, ellipse, confusion_point, luminances, **kwargs)
+
+    color_dict = recolor_algorithm.analyze(image)
+    preview = resize_to_budget(image, preview_pixels)
+    if preview is not image:
+        yield ('preview', Image.fromarray(
+            recolor_algorithm.recolor_strategy.execute(preview, color_dict)))
+    yield ('final', Image.fromarray(
+        recolor_algorithm.recolor_strategy.execute(image, color_dict)))
+
+
+def recolor_lut(image_name, algorithm, ellipse, confusion_point, luminances, size=33, **kwargs):
+    """
+    Finds the recoloring of an image and exports it as a 3D lookup table,
+    without recoloring the pixels.
+    Args:
+        image_name (str): The name of the image to recolor.
+        algorithm (str): The algorithm to use. Either 'tcc' or 'original'.
+        ellipse (dict): The ellipse parameters.
+        confusion_point (dict): The confusion point parameters.
+        luminances (list): The luminance values.
+        size (int, optional): The number of grid points of each channel. Defaults to 33.
+        **kwargs: The options of get_recolor_algorithm.
+
+    Returns:
+        np.ndarray: The (size, size, size, 3) uint8 table, indexed by [r, g, b].
+    """
+    image = load_image(image_name)
+    recolor_algorithm = get_recolor_algorithm(
+        image, algorithm, ellipse, confusion_point, luminances, **kwargs)
+
+    color_dict = recolor_algorithm.analyze(image)
+    return recolor_algorithm.recolor_strategy.export_lut(color_dict, size)
@@ -2,6 +2,7 @@ from .findConfusionColorStrategies.abstract import AbstractFindConfusionColorStr
 from .recolorConfusionColorStrategies.abstract import AbstractRecolorConfusionColorStrategy
 from .recolorStrategies.abstract import AbstractRecolorStrategy
 from .getColorStrategies.abstract import AbstractGetColorStrategy
+from .utils import resize_to_budget
 
 
 class Recolor:
@@ -10,7 +11,8 @@ class Recolor:
         get_color_strategy: AbstractGetColorStrategy,
         find_confusion_color_strategy: AbstractFindConfusionColorStrategy,
         recolor_confusion_color_strategy: AbstractRecolorConfusionColorStrategy,
-        recolor_strategy: AbstractRecolorStrategy
+        recolor_strategy: AbstractRecolorStrategy,
+        analysis_pixels=None
     ):
         """
         Initialize the recoloring algorithm
@@ -20,6 +22,7 @@ class Recolor:
             find_confusion_color_strategy (AbstractFindConfusionColorStrategy): The strategy to find the confusion colors
             recolor_confusion_color_strategy (AbstractRecolorConfusionColorStrategy): The strategy to recolor the confusion colors
             recolor_strategy (AbstractRecolorStrategy): The strategy to recolor the image
+            analysis_pixels (int, optional): The pixel budget of the copy of the image the colors are found on, the image itself if None
         Returns:
             None
         """
@@ -27,6 +30,24 @@ class Recolor:
         self.find_confusion_color_strategy = find_confusion_color_strategy
         self.recolor_confusion_color_strategy = recolor_confusion_color_strategy
         self.recolor_strategy = recolor_strategy
+        self.analysis_pixels = analysis_pixels
+
+    def analyze(self, image):
+        """
+        Find the new colors of the image palette, without recoloring the pixels
+
+        The palette is found on a downsampled copy of the image when
+        analysis_pixels is set, so its cost does not depend on the resolution
+
+        Args:
+            image (PIL.Image): The input image
+        Returns:
+            dict: A dictionary mapping the original colors to the new colors
+        """
+        image = resize_to_budget(image, self.analysis_pixels)
+        colors = self.get_color_strategy.execute(image)
+        color_graph = self.find_confusion_color_strategy.execute(colors)
+        return self.recolor_confusion_color_strategy.execute(color_graph)
 
     def execute(self, image):
         """
@@ -37,8 +58,6 @@ class Recolor:
         Returns:
             tuple[PIL.Image, dict]: A tuple containing the recolored image and a dictionary mapping the original colors to the new colors
         """
-        colors = self.get_color_strategy.execute(image)
-        color_graph = self.find_confusion_color_strategy.execute(colors)
-        color_dict = self.recolor_confusion_color_strategy.execute(color_graph)
+        color_dict = self.analyze(image)
         new_image = self.recolor_strategy.execute(image, color_dict)
         return (new_image, color_dict)
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FitnessCache:
+    """
+    Bounded LRU cache of fitness values keyed by the quantized solution.
+
+    With step None the key is the exact solution, so the cached fitness is the
+    one that would be computed. With a step, solutions in the same cell share
+    the fitness of the first one evaluated, trading exactness for hit rate.
+    """
+
+    def __init__(self, size=4096, step=None) -> None:
+        """
+        Creates an empty cache.
+
+        Args:
+            size (int, optional): The maximum number of entries. Defaults to 4096.
+            step (float | tuple[float, ...], optional): The cell size of each gene, exact keys if None. Defaults to None.
+        Returns:
+            None
+        """
+        self.size = size
+        self.step = None if step is None else np.asarray(step, dtype=float)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, solutions):
+        """
+        Quantizes solutions into cache keys.
+
+        Args:
+            solutions (np.ndarray): The (N, num_genes) solutions.
+        Returns:
+            list[bytes]: The N keys.
+        """
+        solutions = np.asarray(solutions, dtype=float)
+        if self.step is not None:
+            # + 0.0 turns -0.0 into 0.0
+            solutions = np.rint(solutions / self.step) + 0.0
+        return [row.tobytes() for row in np.ascontiguousarray(solutions)]
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def wrap(self, fitness_func):
+        """
+        Caches a pygad fitness function of one solution.
+
+        Args:
+            fitness_func (callable): Maps (solution, solution_idx) to its fitness.
+        Returns:
+            callable: The cached function.
+        """
+        def cached(solution, solution_idx):
+            [key] = self.keys([solution])
+            value = self.get(key)
+            if value is None:
+                value = fitness_func(solution, solution_idx)
+                self.put(key, value)
+            return value
+
+        return cached
+
+    def wrap_population(self, fitness_func):
+        """
+        Caches a fitness function of a whole population, evaluating the
+        missing solutions in one call.
+
+        Args:
+            fitness_func (callable): Maps the (N, num_genes) population to its (N,) fitness.
+        Returns:
+            callable: The cached function.
+        """
+        def cached(population):
+            keys = self.keys(population)
+            fitness = np.empty(len(keys))
+            missing = []
+            for (i, key) in enumerate(keys):
+                value = self.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    fitness[i] = value
+            if missing:
+                fitness[missing] = fitness_func(population[missing])
+                for i in missing:
+                    self.put(keys[i], fitness[i])
+            return fitness
+
+        return cached
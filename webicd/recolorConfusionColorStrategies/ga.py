@@ -0,0 +1,198 @@
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+
+def seed_population(population, solutions, low, high):
+    """
+    Replaces the first solutions of a population, in place.
+
+    Args:
+        population (np.ndarray): The (sol_per_pop, num_genes) population.
+        solutions (np.ndarray): The (k, num_genes) solutions, only the first sol_per_pop are used.
+        low (np.ndarray): The lower bound of each gene.
+        high (np.ndarray): The upper bound of each gene.
+    Returns:
+        np.ndarray: The population.
+    """
+    solutions = np.asarray(solutions, dtype=float).reshape(-1, population.shape[1])
+    solutions = solutions[:len(population)]
+    population[:len(solutions)] = np.clip(solutions, low, high)
+    return population
+
+
+class GeneticOptimizer:
+    """
+    Genetic algorithm over a population array, with the operators GeneticRecolor
+    uses from pygad: steady state ("sss") parent selection, single point
+    crossover and random mutation by replacement from a {'low', 'high'} gene
+    space.
+
+    The fitness function receives the whole (sol_per_pop, num_genes)
+    population and returns its (sol_per_pop,) fitness, so it can be evaluated
+    with array operations instead of one Python call per solution. The random
+    draws are the ones pygad makes from the global random states, taken from
+    private generators seeded with random_state, so the result is the same as
+    a pygad run seeded with it.
+    """
+
+    def __init__(self, fitness_func, gene_space, num_generations=1000, num_parents_mating=4,
+                 sol_per_pop=20, keep_parents=1, mutation_num_genes=3, random_state=None,
+                 on_generation=None, initial_population=None, initial_solutions=None) -> None:
+        """
+        Creates the optimizer.
+
+        Args:
+            fitness_func (callable): Maps the (sol_per_pop, num_genes) population to its fitness.
+            gene_space (list[dict]): The {'low', 'high'} range of each gene.
+            num_generations (int, optional): The number of generations. Defaults to 1000.
+            num_parents_mating (int, optional): The number of parents selected in each generation. Defaults to 4.
+            sol_per_pop (int, optional): The population size. Defaults to 20.
+            keep_parents (int, optional): The number of best solutions kept in the next generation. Defaults to 1.
+            mutation_num_genes (int, optional): The number of genes replaced in each offspring. Defaults to 3.
+            random_state (int, optional): The seed of the random generators. Defaults to None.
+            on_generation (callable, optional): Called with the optimizer after each generation, stops the run when
+                it returns "stop", as in pygad (see EarlyStopping). Defaults to None.
+            initial_population (np.ndarray, optional): The (sol_per_pop, num_genes) initial population, used
+                instead of random draws (and, as in pygad, without drawing them). Defaults to None.
+            initial_solutions (np.ndarray, optional): Solutions replacing the first random ones of the initial
+                population (clipped to the gene space), to warm start the run. Defaults to None.
+        Returns:
+            None
+        """
+        self.fitness_func = fitness_func
+        self.low = np.asarray([gene['low'] for gene in gene_space], dtype=float)
+        self.high = np.asarray([gene['high'] for gene in gene_space], dtype=float)
+        self.num_genes = len(gene_space)
+        self.num_generations = num_generations
+        self.num_parents_mating = num_parents_mating
+        self.sol_per_pop = sol_per_pop
+        self.keep_parents = keep_parents
+        self.mutation_num_genes = mutation_num_genes
+        self.random_state = random_state
+        self.on_generation = on_generation
+        self.initial_population = initial_population
+        self.initial_solutions = initial_solutions
+
+    def steady_state_selection(self, fitness, num_parents):
+        # best first, ties to the highest index (pygad reverses a stable sort)
+        order = np.argsort(fitness, kind='stable')[::-1][:num_parents]
+        return self.population[order], order
+
+    def single_point_crossover(self, parents, num_offspring):
+        points = self.np_random.randint(0, self.num_genes, size=num_offspring)
+        k = np.arange(num_offspring)
+        first = parents[k % len(parents)]
+        second = parents[(k + 1) % len(parents)]
+        genes = np.arange(self.num_genes)
+        return np.where(genes[np.newaxis, :] < points[:, np.newaxis], first, second)
+
+    def random_mutation(self, offspring):
+        # each offspring replaces mutation_num_genes distinct genes, in the
+        # order drawn, with uniform values from their space
+        genes = np.asarray([self.random.sample(range(self.num_genes), self.mutation_num_genes)
+                            for _ in range(len(offspring))], dtype=np.intp).reshape(len(offspring), -1)
+        values = self.np_random.uniform(self.low[genes], self.high[genes])
+        np.put_along_axis(offspring, genes, values, axis=1)
+        return offspring
+
+    def run(self):
+        """
+        Evolves the population for num_generations generations, or until
+        on_generation stops it.
+
+        Returns:
+            None
+        """
+        self.random = Random(self.random_state)
+        self.np_random = np.random.RandomState(self.random_state)
+
+        if self.initial_population is not None:
+            self.population = np.array(self.initial_population, dtype=float)
+        else:
+            self.population = self.np_random.uniform(
+                self.low, self.high, size=(self.sol_per_pop, self.num_genes))
+        if self.initial_solutions is not None:
+            seed_population(self.population, self.initial_solutions, self.low, self.high)
+        self.last_generation_fitness = self.fitness_func(self.population)
+        num_offspring = self.sol_per_pop - self.keep_parents
+        self.generations_completed = 0
+
+        for generation in range(self.num_generations):
+            parents, _ = self.steady_state_selection(
+                self.last_generation_fitness, self.num_parents_mating)
+            offspring = self.single_point_crossover(parents, num_offspring)
+            offspring = self.random_mutation(offspring)
+
+            parents_to_keep, kept = self.steady_state_selection(
+                self.last_generation_fitness, self.keep_parents)
+            kept_fitness = self.last_generation_fitness[kept]
+            self.population = np.concatenate((parents_to_keep, offspring))
+            # the kept parents are not evaluated again
+            self.last_generation_fitness = np.concatenate(
+                (kept_fitness, self.fitness_func(offspring)))
+            self.generations_completed = generation + 1
+
+            if self.on_generation is not None and self.on_generation(self) == "stop":
+                break
+
+    def best_solution(self):
+        """
+        Returns the best solution of the last population.
+
+        Returns:
+            tuple[np.ndarray, float, int]: The solution, its fitness and its index.
+        """
+        index = int(np.argmax(self.last_generation_fitness))
+        return (self.population[index].copy(), self.last_generation_fitness[index], index)
+
+
+class EarlyStopping:
+    """
+    on_generation callback that stops a run (of GeneticOptimizer or pygad.GA)
+    on the first criterion met. Create one right before each run, the time
+    limit counts from its creation.
+    """
+
+    def __init__(self, plateau=None, target=None, max_evaluations=None, time_limit=None) -> None:
+        """
+        Creates the callback.
+
+        Args:
+            plateau (int, optional): Stops after this many generations without improving the best fitness. Defaults to None.
+            target (callable, optional): Stops when it returns True for the best solution. Defaults to None.
+            max_evaluations (int, optional): Stops before a generation would exceed this many fitness evaluations. Defaults to None.
+            time_limit (float, optional): Stops after this many seconds. Defaults to None.
+        Returns:
+            None
+        """
+        self.plateau = plateau
+        self.target = target
+        self.max_evaluations = max_evaluations
+        self.time_limit = time_limit
+        self.start = perf_counter()
+        self.best_fitness = -np.inf
+        self.best_generation = 0
+
+    def __call__(self, ga):
+        fitness = np.asarray(ga.last_generation_fitness)
+        index = int(np.argmax(fitness))
+        if fitness[index] > self.best_fitness:
+            self.best_fitness = fitness[index]
+            self.best_generation = ga.generations_completed
+
+        if self.plateau is not None and \
+                ga.generations_completed - self.best_generation >= self.plateau:
+            return "stop"
+        if self.target is not None and self.target(ga.population[index]):
+            return "stop"
+        if self.max_evaluations is not None:
+            # the kept parents are not evaluated again
+            per_generation = ga.sol_per_pop - ga.keep_parents
+            evaluations = ga.sol_per_pop + ga.generations_completed * per_generation
+            if evaluations + per_generation > self.max_evaluations:
+                return "stop"
+        if self.time_limit is not None and perf_counter() - self.start >= self.time_limit:
+            return "stop"
+        return None
@@ -1,26 +1,83 @@
-from random import seed
 # from webicd.utils import is_visible_luv_gama
-from webicd.utils import color_distance, is_visible_luv_gama
-from webicd.icd import differentiantion_ar, differentiantion_mean
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from webicd.gamut import get_gamut
+from webicd.utils import (color_distance, global_random_state, is_visible_luv_gama,
+                          is_visible_luv_gama_ar)
+from webicd.icd import DiscriminationModel
 from .abstract import AbstractRecolorConfusionColorStrategy
+from .cache import FitnessCache
+from .ga import EarlyStopping, GeneticOptimizer, seed_population
+from .greedy import GreedyScheduler
+from .store import profile_key
+import numpy as np
 import pygad
 
 
+GENE_SPACE = [{'low': 0, 'high': 100}, {
+    'low': 0, 'high': 0.7}, {'low': 0, 'high': 0.6}]
+
+# bounds of the gamut the initial populations are drawn from (see webicd.gamut)
+GENE_BOUNDS = tuple((gene['low'], gene['high']) for gene in GENE_SPACE)
+
+
 class GeneticRecolor(AbstractRecolorConfusionColorStrategy):
-    def __init__(self, ellipse, confusion_point, luminances, random_state=None) -> None:
+    def __init__(self, ellipse, confusion_point, luminances, random_state=None, backend='native',
+                 n_jobs=None, num_generations=1000, plateau=None, stop_when_distinct=False,
+                 max_evaluations=None, time_limit=None, cache_size=None, cache_step=None,
+                 store=None, profile=None, gamut_init=True) -> None:
+        """
+        Recolors the confusing colors with a genetic algorithm.
+
+        Args:
+            ellipse (dict): The ellipse parameters.
+            confusion_point (list): The confusion point.
+            luminances (dict): The luminance values.
+            random_state (int, optional): The seed of each run. Defaults to None.
+            backend (str, optional): 'native' evaluates the whole population at once (see ga.py),
+                'pygad' runs pygad with one fitness call per solution. Both give the same colors. pygad only draws
+                from the global random states, so each run holds the process-wide lock of utils.global_random_state
+                and concurrent pygad runs (e.g. the threads of a server) wait for each other; the native backend
+                has its own generators and needs no lock. Defaults to 'native'.
+            n_jobs (int, optional): The number of processes optimizing the vertices. Defaults to None (1).
+            num_generations (int, optional): The maximum number of generations of each run. Defaults to 1000.
+            plateau (int, optional): Stops a run after this many generations without improvement. Defaults to None.
+            stop_when_distinct (bool, optional): Stops a run once its best solution differs (> 1) from all the other colors. Defaults to False.
+            max_evaluations (int, optional): The maximum number of fitness evaluations of each run. Defaults to None.
+            time_limit (float, optional): The maximum number of seconds of each run. Defaults to None.
+            cache_size (int, optional): The number of fitness values cached (LRU) in each run, no cache if None. Defaults to None.
+            cache_step (float | tuple, optional): The quantization step of the cache keys, exact solutions if None. Defaults to None.
+            store (SolutionStore, optional): Prior solutions seeding the initial populations, updated with the new ones. Defaults to None.
+            profile (str, optional): The key of the calibration profile in the store. Defaults to profile_key of the parameters.
+            gamut_init (bool, optional): Draws the initial populations from the visible colors of the gene space
+                instead of the whole gene space. Defaults to True.
+        Returns:
+            None
+        """
+        if backend not in ('native', 'pygad'):
+            raise ValueError(f'Unknown genetic backend: {backend}')
         self.ellipse = ellipse
         self.confusion_point = confusion_point
         self.luminances = luminances
         self.random_state = random_state
+        self.backend = backend
+        self.n_jobs = n_jobs
+        self.num_generations = num_generations
+        self.plateau = plateau
+        self.stop_when_distinct = stop_when_distinct
+        self.max_evaluations = max_evaluations
+        self.time_limit = time_limit
+        self.cache_size = cache_size
+        self.cache_step = cache_step
+        self.store = store
+        self.gamut_init = gamut_init
+        self.profile = profile_key(ellipse, confusion_point, luminances) \
+            if profile is None else profile
+        self.model = DiscriminationModel(ellipse, confusion_point, luminances)
 
     def fitness(self, original_color, colors_array, alpha):
         def fitness_func(solution, solution_idx):
-            diff = differentiantion_mean(
-                self.ellipse,
-                self.confusion_point,
-                self.luminances,
-                solution, colors_array
-            )
+            diff = self.model.differentiation_mean(solution, colors_array)
             distance = color_distance(original_color, solution)
             
             visible = 0 if is_visible_luv_gama(solution) else -10000000
@@ -28,10 +85,81 @@ class GeneticRecolor(AbstractRecolorConfusionColorStrategy):
 
         return fitness_func
 
-    def get_GA(self, original_color, colors_array, alpha):
-        seed(self.random_state)
+    def population_fitness(self, original_color, colors_array, alpha):
+        original_color = np.asarray(original_color, dtype=float)
+
+        def fitness_func(population):
+            diff = self.model.differentiation_mean(population, colors_array)
+            d = population - original_color
+            distance = np.sqrt(d[:, 0] ** 2 + d[:, 1] ** 2 + d[:, 2] ** 2)
+
+            visible = np.where(is_visible_luv_gama_ar(population), 0, -10000000)
+            return (alpha * diff) + ((1 - alpha) * -distance) + visible
+
+        return fitness_func
+
+    def early_stopping(self, colors_array):
+        """
+        Creates the on_generation callback of a run, None without stopping criteria.
+
+        Args:
+            colors_array (np.ndarray): The other colors.
+        Returns:
+            EarlyStopping | None: The callback.
+        """
+        target = None
+        if self.stop_when_distinct:
+            def target(solution):
+                return bool(self.model.differentiation_all(solution, colors_array))
+        if self.plateau is None and target is None and \
+                self.max_evaluations is None and self.time_limit is None:
+            return None
+        return EarlyStopping(self.plateau, target, self.max_evaluations, self.time_limit)
+
+    def initial_population(self, seeds=None):
+        """
+        Draws the initial population of a run from the visible colors of the
+        gene space, the same for both backends. None without gamut_init.
+
+        Args:
+            seeds (np.ndarray, optional): Solutions replacing the first ones. Defaults to None.
+        Returns:
+            np.ndarray | None: The (sol_per_pop, num_genes) population.
+        """
+        if not self.gamut_init:
+            return None
+        population = get_gamut('gama', GENE_BOUNDS).sample(
+            20, np.random.default_rng(self.random_state))
+        if seeds is not None:
+            seed_population(population, seeds,
+                            [low for (low, _) in GENE_BOUNDS], [high for (_, high) in GENE_BOUNDS])
+        return population
+
+    def get_native_GA(self, original_color, colors_array, alpha, cache=None, seeds=None):
+        colors_array = np.asarray(colors_array, dtype=float)
+        fitness_function = self.population_fitness(
+            original_color, colors_array, alpha)
+        if cache is not None:
+            fitness_function = cache.wrap_population(fitness_function)
+        initial_population = self.initial_population(seeds)
+        return GeneticOptimizer(fitness_function, GENE_SPACE,
+                                num_generations=self.num_generations,
+                                num_parents_mating=4,
+                                sol_per_pop=20,
+                                keep_parents=1,
+                                mutation_num_genes=3,
+                                random_state=self.random_state,
+                                on_generation=self.early_stopping(colors_array),
+                                initial_population=initial_population,
+                                initial_solutions=None if initial_population is not None else seeds)
+
+    def get_GA(self, original_color, colors_array, alpha, cache=None, seeds=None):
+        colors_array = np.asarray(colors_array, dtype=float)
         fitness_function = self.fitness(original_color, colors_array, alpha)
-        num_generations = 1000
+        if cache is not None:
+            fitness_function = cache.wrap(fitness_function)
+        num_generations = self.num_generations
+        early_stopping = self.early_stopping(colors_array)
         num_parents_mating = 4
 
         sol_per_pop = 20
@@ -49,8 +177,15 @@ class GeneticRecolor(AbstractRecolorConfusionColorStrategy):
         mutation_num_genes = 3
         mutation_by_replacement = False
 
-        gene_space = [{'low': 0, 'high': 100}, {
-            'low': 0, 'high': 0.7}, {'low': 0, 'high': 0.6}]
+        gene_space = GENE_SPACE
+
+        initial_population = self.initial_population(seeds)
+        if initial_population is None and seeds is not None:
+            # same draws as pygad's own initialization, then the seeds
+            low = np.asarray([gene['low'] for gene in gene_space], dtype=float)
+            high = np.asarray([gene['high'] for gene in gene_space], dtype=float)
+            initial_population = seed_population(np.random.uniform(
+                low, high, size=(sol_per_pop, num_genes)), seeds, low, high)
 
         ga_instance = pygad.GA(num_generations=num_generations,
                                num_parents_mating=num_parents_mating,
@@ -65,24 +200,79 @@ class GeneticRecolor(AbstractRecolorConfusionColorStrategy):
                                mutation_type=mutation_type,
                                mutation_num_genes=mutation_num_genes,
                                gene_space=gene_space,
-                               mutation_by_replacement=mutation_by_replacement)
+                               mutation_by_replacement=mutation_by_replacement,
+                               initial_population=initial_population,
+                               # pygad only accepts plain one parameter functions
+                               on_generation=None if early_stopping is None
+                               else (lambda ga: early_stopping(ga)))
         return ga_instance
 
+    def optimize(self, index, colors, seeds=None):
+        """
+        Runs the genetic algorithm of one vertex. It only depends on the
+        original palette, so the vertices can be optimized in any order.
+
+        Args:
+            index (int): The vertex.
+            colors (list[tuple]): The colors of all the vertices.
+            seeds (np.ndarray, optional): Solutions seeding the initial population. Defaults to None.
+        Returns:
+            tuple[np.ndarray, float, int, tuple[int, int]]: The best solution, its fitness, the number of
+                generations run and the fitness cache (hits, misses).
+        """
+        v_color = colors[index]
+        cache = None if self.cache_size is None else \
+            FitnessCache(self.cache_size, self.cache_step)
+        if self.backend == 'native':
+            ga_instance = self.get_native_GA(
+                v_color, colors[:index]+colors[index+1:], 0.5, cache, seeds)
+            ga_instance.run()
+        else:
+            # pygad only draws from the global random states
+            with global_random_state(self.random_state):
+                ga_instance = self.get_GA(
+                    v_color, colors[:index]+colors[index+1:], 0.5, cache, seeds)
+                ga_instance.run()
+        solution, solution_fitness, solution_idx = ga_instance.best_solution()
+        cache_stats = (0, 0) if cache is None else (cache.hits, cache.misses)
+        return solution, solution_fitness, ga_instance.generations_completed, cache_stats
+
     def execute(self, colorGraph):
         color_dict = {}
+        # number of generations run for each recolored vertex
+        self.generations_ = {}
+        # fitness cache lookups of all the runs
+        self.cache_hits_ = 0
+        self.cache_misses_ = 0
         colors = colorGraph.vs["color"]
 
-        # while there is some node with degree greater than 0
-        while len(colorGraph.vs(_degree_gt=0)) > 0:
-            vertices = colorGraph.vs.select(_degree=colorGraph.maxdegree())
-            v = vertices[0]
-            v_color = v["color"]
-            index = v.index
-            # print(v_color)
-            ga_instance = self.get_GA(
-                v_color, colors[:index]+colors[index+1:], 0.5)
-            ga_instance.run()
-            solution, solution_fitness, solution_idx = ga_instance.best_solution()
+        # while there is some node with degree greater than 0, take the
+        # (first) node with the greatest degree and delete its edges
+        order = list(GreedyScheduler(colorGraph))
+
+        # warm start from the solutions of nearby colors, read here so that
+        # the worker processes do not touch the store
+        seeds = [None] * len(order)
+        if self.store is not None:
+            seeds = [self.store.get(self.profile, colors[index]) for index in order]
+            seeds = [None if len(s) == 0 else s for s in seeds]
+
+        if (self.n_jobs or 1) > 1 and len(order) > 1:
+            # every run is seeded with random_state, the pool gives the same
+            # solutions as the serial loop
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                results = list(executor.map(
+                    self.optimize, order, repeat(colors), seeds))
+        else:
+            results = map(self.optimize, order, repeat(colors), seeds)
+
+        for (index, (solution, solution_fitness, generations, (hits, misses))) in zip(order, results):
+            v_color = colors[index]
+            self.generations_[index] = generations
+            self.cache_hits_ += hits
+            self.cache_misses_ += misses
+            print("Generations run = {generations}".format(
+                generations=generations))
             print("Parameters of the best solution : {solution}".format(
                 solution=solution))
             print("Fitness value of the best solution = {solution_fitness}".format(
@@ -91,14 +281,18 @@ class GeneticRecolor(AbstractRecolorConfusionColorStrategy):
                 solution_distance=color_distance(v_color, solution)
             ))
             print("Difference between solution and other colors = {solution_difference}".format(
-                solution_difference=differentiantion_mean(self.ellipse,
-                                                          self.confusion_point,
-                                                          self.luminances,
-                                                          solution, colors[:index]+colors[index+1:])
+                solution_difference=self.model.differentiation_mean(
+                    solution, colors[:index]+colors[index+1:])
             ))
 
-            colorGraph.delete_edges(v.all_edges())
             color_dict[v_color] = tuple(solution)
+            if self.store is not None and is_visible_luv_gama(solution):
+                self.store.put(self.profile, v_color, solution)
+
+        if self.cache_size is not None:
+            lookups = self.cache_hits_ + self.cache_misses_
+            print("Fitness cache hits = {hits}/{lookups}".format(
+                hits=self.cache_hits_, lookups=lookups))
 
         for vertice in colorGraph.vs:
             color = vertice["color"]
@@ -0,0 +1,66 @@
+from heapq import heappop, heappush
+
+import numpy as np
+
+
+class GreedyScheduler:
+    """
+    Yields the vertices of a confusion graph in the order of the greedy loop
+
+        while len(graph.vs(_degree_gt=0)) > 0:
+            v = graph.vs.select(_degree=graph.maxdegree())[0]
+            graph.delete_edges(v.all_edges())
+
+    without modifying the graph. The adjacency is kept in CSR form and the
+    vertices in one min-heap per degree, so ties still go to the lowest index
+    and each step only updates the neighbors of the chosen vertex.
+    """
+
+    def __init__(self, graph) -> None:
+        """
+        Builds the CSR adjacency of the graph.
+
+        Args:
+            graph (igraph.Graph): The confusion graph.
+        Returns:
+            None
+        """
+        n = graph.vcount()
+        edges = np.asarray(graph.get_edgelist(), dtype=int).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        source = np.concatenate((edges[:, 0], edges[:, 1]))
+        target = np.concatenate((edges[:, 1], edges[:, 0]))
+        order = np.argsort(source, kind='stable')
+
+        counts = np.bincount(source, minlength=n)
+        self.indptr = np.concatenate(([0], np.cumsum(counts))).tolist()
+        self.indices = target[order].tolist()
+        self.degree = counts.tolist()
+
+    def __iter__(self):
+        degree = list(self.degree)
+        removed = [False] * len(degree)
+        max_degree = max(degree, default=0)
+        buckets = [[] for _ in range(max_degree + 1)]
+        for v, d in enumerate(degree):
+            # indices are increasing, so each bucket is already a heap
+            buckets[d].append(v)
+
+        while max_degree > 0:
+            bucket = buckets[max_degree]
+            while bucket and (removed[bucket[0]] or degree[bucket[0]] != max_degree):
+                heappop(bucket)
+            if not bucket:
+                max_degree -= 1
+                continue
+
+            v = heappop(bucket)
+            removed[v] = True
+            degree[v] = 0
+            yield v
+
+            for u in self.indices[self.indptr[v]:self.indptr[v + 1]]:
+                if not removed[u]:
+                    degree[u] -= 1
+                    if degree[u] > 0:
+                        heappush(buckets[degree[u]], u)
@@ -1,56 +1,64 @@
-from random import seed
-from webicd.icd import differentiantion_ar
-from webicd.utils import random_luv, random_luv_chroma
+import numpy as np
+from webicd.icd import DiscriminationModel
+from webicd.utils import random_luv_ar, random_visible_luv_ar
 from .abstract import AbstractRecolorConfusionColorStrategy
+from .greedy import GreedyScheduler
 
 
 class RandomRecolor(AbstractRecolorConfusionColorStrategy):
-    def __init__(self, ellipse, confusion_point, luminances, random_state=None, max_steps=10000) -> None:
+    def __init__(self, ellipse, confusion_point, luminances, random_state=None, max_steps=10000, batch_size=256,
+                 gamut=True) -> None:
         self.ellipse = ellipse
         self.confusion_point = confusion_point
         self.luminances = luminances
         self.random_state = random_state
         self.max_steps = max_steps
+        self.batch_size = batch_size
+        # draw the candidates from the visible gamut instead of from sRGB
+        self.gamut = gamut
+        self.model = DiscriminationModel(ellipse, confusion_point, luminances)
+
+    def find_color(self, rng, other_colors):
+        """
+        Draws random colors in batches until one differs from all the other colors.
+
+        Args:
+            rng (np.random.Generator): The random generator.
+            other_colors (np.ndarray): The colors to differ from.
+        Returns:
+            tuple[float, float, float] | None: The color, or None after max_steps + 1 tries.
+        """
+        remaining = self.max_steps + 1
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            candidates = random_visible_luv_ar(size, rng) if self.gamut \
+                else random_luv_ar(size, rng)
+            found = np.flatnonzero(
+                self.model.differentiation_all(candidates, other_colors))
+            if len(found) > 0:
+                return tuple(candidates[found[0]].tolist())
+            remaining -= len(candidates)
+        return None
 
     def execute(self, colorGraph):
         print('Executing RandomRecolor')
-        seed(self.random_state)
+        rng = np.random.default_rng(self.random_state)
         color_dict = {}
         colors = colorGraph.vs["color"]
 
-        # while there is some node with degree greater than 0
-        while len(colorGraph.vs(_degree_gt=0)) > 0:
-            vertices = colorGraph.vs.select(_degree=colorGraph.maxdegree())
-            v = vertices[0]
-            v_color = v["color"]
+        # while there is some node with degree greater than 0, take the
+        # (first) node with the greatest degree and delete its edges
+        for index in GreedyScheduler(colorGraph):
+            v_color = colors[index]
             print(f'v_color: {v_color}')
 
-            new_color = random_luv(random_state=None)
-            index = v.index
-            all_diff = differentiantion_ar(
-                self.ellipse,
-                self.confusion_point,
-                self.luminances,
-                new_color, colors[:index]+colors[index+1:]
-            )
-            step = 0
-            while not all_diff and self.max_steps > step:
-                print(f"{v_color} -> {new_color}, {step}")
-                new_color = random_luv(random_state=None)
-                all_diff = differentiantion_ar(
-                    self.ellipse,
-                    self.confusion_point,
-                    self.luminances,
-                    new_color, colors[:index]+colors[index+1:]
-                )
-                step += 1
-
-            colorGraph.delete_edges(v.all_edges())
-            if (all_diff):
+            other_colors = np.asarray(colors[:index]+colors[index+1:])
+            new_color = self.find_color(rng, other_colors)
+
+            if new_color is not None:
                 color_dict[v_color] = new_color
             else:
                 color_dict[v_color] = v_color
-            
 
         for vertice in colorGraph.vs:
             color = vertice["color"]
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import product
+from threading import Lock
+import json
+import sqlite3
+
+import numpy as np
+
+
+def profile_key(ellipse, confusion_point, luminances):
+    """
+    Returns a key identifying a calibration profile.
+
+    Args:
+        ellipse (dict): The ellipse parameters.
+        confusion_point (list): The confusion point.
+        luminances (dict): The luminance values.
+    Returns:
+        str: The key.
+    """
+    return json.dumps([ellipse, confusion_point, luminances], sort_keys=True)
+
+
+class SolutionStore:
+    """
+    Best GA solutions of previously recolored colors, keyed by (profile, cell)
+    where cell is the original color quantized on a Luv grid.
+
+    Entries are kept in an in-process LRU and, when a path is given, in a
+    sqlite3 database shared by every process and kept between runs. The
+    database is opened on each access, so the store can be pickled to worker
+    processes. The entries are guarded by a lock, so one store can be shared by
+    the threads of a server.
+    """
+
+    def __init__(self, step=(5, 10, 10), size=4096, path=None, radius=1, max_seeds=5) -> None:
+        """
+        Creates the store.
+
+        Args:
+            step (float | tuple[float, float, float], optional): The Luv cell size. Defaults to (5, 10, 10).
+            size (int, optional): The maximum number of entries in memory. Defaults to 4096.
+            path (str, optional): The sqlite3 database, in memory only if None. Defaults to None.
+            radius (int, optional): The cells around the color searched for seeds. Defaults to 1.
+            max_seeds (int, optional): The maximum number of seeds returned. Defaults to 5.
+        Returns:
+            None
+        """
+        self.step = np.asarray(step, dtype=float) * np.ones(3)
+        self.size = size
+        self.path = path
+        self.radius = radius
+        self.max_seeds = max_seeds
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        if path is not None:
+            with self.connect() as connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS solutions ('
+                    'profile TEXT, L INTEGER, u INTEGER, v INTEGER, '
+                    'solution_L REAL, solution_u REAL, solution_v REAL, '
+                    'PRIMARY KEY (profile, L, u, v))')
+
+    def __getstate__(self):
+        # locks cannot be pickled, each copy gets its own
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    @contextmanager
+    def connect(self):
+        # commits on success and always closes the database
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def cell(self, color):
+        return tuple(int(c) for c in np.floor(np.asarray(color, dtype=float) / self.step))
+
+    def _remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def _load(self, profile, cells):
+        # cells missing from memory are read from the database
+        missing = [cell for cell in cells if (profile, cell) not in self.entries]
+        if self.path is None or not missing:
+            return
+        with self.connect() as connection:
+            for cell in missing:
+                row = connection.execute(
+                    'SELECT solution_L, solution_u, solution_v FROM solutions '
+                    'WHERE profile = ? AND L = ? AND u = ? AND v = ?',
+                    (profile,) + cell).fetchone()
+                if row is not None:
+                    self._remember((profile, cell), tuple(row))
+
+    def get(self, profile, color):
+        """
+        Returns the solutions stored for the cells around a color, closest cells first.
+
+        Args:
+            profile (str): The profile key.
+            color (tuple[float, float, float]): The original Luv color.
+        Returns:
+            np.ndarray: The (k, 3) solutions, k <= max_seeds.
+        """
+        center = np.asarray(self.cell(color))
+        offsets = sorted(product(range(-self.radius, self.radius + 1), repeat=3),
+                         key=lambda offset: sum(o * o for o in offset))
+        cells = [tuple(int(c) for c in center + offset) for offset in offsets]
+
+        seeds = []
+        with self.lock:
+            self._load(profile, cells)
+            for cell in cells:
+                solution = self.entries.get((profile, cell))
+                if solution is not None:
+                    self.entries.move_to_end((profile, cell))
+                    seeds.append(solution)
+                    if len(seeds) == self.max_seeds:
+                        break
+        return np.asarray(seeds, dtype=float).reshape(-1, 3)
+
+    def put(self, profile, color, solution):
+        """
+        Stores the best solution found for a color, replacing the one of its cell.
+
+        Args:
+            profile (str): The profile key.
+            color (tuple[float, float, float]): The original Luv color.
+            solution (tuple[float, float, float]): The solution.
+        Returns:
+            None
+        """
+        cell = self.cell(color)
+        solution = tuple(float(s) for s in solution)
+        with self.lock:
+            self._remember((profile, cell), solution)
+        if self.path is not None:
+            with self.connect() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (profile,) + cell + solution)
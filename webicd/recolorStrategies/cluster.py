@@ -1,12 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
 from PIL.Image import Image
-from webicd.convert import luv_gama_to_rgb, rgb_to_luv_gama
+from webicd.tables import luv_gama_to_rgb_lut, rgb_to_luv_gama_lut
+from webicd.utils import get_pixels_histogram
 from .abstract import AbstractRecolorStrategy
 import numpy as np
 
 
 class RecolorCluster(AbstractRecolorStrategy):
-    def __init__(self, model) -> None:
+    def __init__(self, model, unique=True, tile_rows=None, n_jobs=None,
+                 dtype=np.float64) -> None:
+        """
+        Recolors the image by moving each pixel along with its cluster.
+
+        Args:
+            model (sklearn.cluster.KMeans | Quantize): The model that clustered the palette.
+            unique (bool, optional): Whether to recolor each distinct color once instead of each pixel. Defaults to True.
+            tile_rows (int, optional): The number of rows processed at once, all of them if None. Defaults to None.
+            n_jobs (int, optional): The number of threads processing the bands. Defaults to None (1).
+            dtype (np.dtype, optional): The dtype the Luv pixels are translated and converted back in, np.float32 lowers the peak memory by about a quarter. Defaults to np.float64.
+        Returns:
+            None
+        """
         self.model = model
+        self.unique = unique
+        self.tile_rows = tile_rows
+        self.n_jobs = n_jobs
+        self.dtype = dtype
 
     @staticmethod
     def translate(point, basePoint, newBasePoint):
@@ -16,84 +35,141 @@ class RecolorCluster(AbstractRecolorStrategy):
         return (point[0] + L, point[1] + u, point[2] + v)
 
     @staticmethod
-    def recolor(model, color_dict):
-        colors = model.cluster_centers_
-        labels = model.predict()
-
-        def recolor_pixel(pixel_color):
-            # print(pixel_color)
-            pixel_color_luv = rgb_to_luv_gama(pixel_color)
-            cluster_label = model.predict(pixel_color_luv)
-            label_color = colors[cluster_label]
-            label_color_recolor = color_dict[label_color]
-            new_pixel_color_luv = RecolorCluster.translate(
-                pixel_color_luv, label_color, label_color_recolor)
-            new_pixel_color = luv_gama_to_rgb(new_pixel_color_luv)
-            return new_pixel_color
-        return recolor_pixel
-
-    @staticmethod
-    def recolor2(colors, labels, color_dict, pivot_colors):
+    def deltas(pivot_colors, color_dict):
         '''
-        Recolor a pixel based on its cluster label.
+        Offset of each cluster, indexed by label, so that translating a color
+        of cluster i is color + deltas[i]. color_dict is keyed by the exact
+        pivot colors, a KeyError means it belongs to another model.
         '''
-        def aux(idx):
-            actual_color = colors[idx]
-            pivot = pivot_colors[labels[idx]]
-            pivot_recolor = color_dict[tuple(pivot)]
-            recolor = RecolorCluster.translate(
-                actual_color, pivot, pivot_recolor)
-            return recolor
-        return aux
+        deltas = np.zeros((len(pivot_colors), 3))
+        for (label, pivot) in enumerate(pivot_colors):
+            pivot_recolor = color_dict.get(tuple(pivot))
+            if pivot_recolor is None:
+                raise KeyError(
+                    f'No new color for the palette color {tuple(pivot)} of label {label}')
+            # same offset as translate(color, pivot, pivot_recolor)
+            deltas[label] = np.asarray(pivot, dtype=float) - \
+                np.asarray(pivot_recolor, dtype=float)
+        return deltas
+
+    def pixel_labels(self, image: Image):
+        """
+        Returns the palette index of each pixel when the model already knows
+        them (see getColorStrategies.quantize), None otherwise.
+        """
+        labels = getattr(self.model, 'pixel_labels_', None)
+        if labels is None or getattr(self.model, 'image_size_', None) != image.size:
+            return None
+        return labels
+
+    def predict(self, pixels, chunk_size=2 ** 16):
+        """
+        Predicts the palette index of an (N, 3) array of RGB colors from their
+        float64 Luv, whatever the dtype, so that float32 round-off does not
+        move colors on a cell or cluster border to another palette color.
+        The colors are converted in chunks, to keep the float32 memory bound.
+
+        Args:
+            pixels (np.ndarray): The (N, 3) uint8 colors.
+            chunk_size (int, optional): The number of colors converted at once. Defaults to 2 ** 16.
+        Returns:
+            np.ndarray: The (N,) palette indexes.
+        """
+        # in the dtype the model was fitted with
+        centers = np.asarray(self.model.cluster_centers_)
+        labels = np.empty(len(pixels), dtype=np.intp)
+        for start in range(0, len(pixels), chunk_size):
+            luv = rgb_to_luv_gama_lut(pixels[start:start + chunk_size], np.float64)
+            labels[start:start + chunk_size] = self.model.predict(
+                luv.astype(centers.dtype, copy=False))
+        return labels
+
+    def recolor_pixels(self, pixels, deltas, labels=None):
+        """
+        Recolors an (N, 3) array of RGB colors.
+
+        Args:
+            pixels (np.ndarray): The (N, 3) uint8 colors.
+            deltas (np.ndarray): The offset of each cluster (see deltas).
+            labels (np.ndarray, optional): The palette index of each color. Defaults to the model prediction.
+        Returns:
+            np.ndarray: The (N, 3) uint8 recolored colors.
+        """
+        if labels is None:
+            labels = self.predict(pixels)
+        # transform to luv, only translated and converted back in self.dtype
+        array = rgb_to_luv_gama_lut(pixels, self.dtype)
+        array += deltas[labels]
+
+        array = luv_gama_to_rgb_lut(array)
+        return array.astype('uint8')
+
+    def recolor_band(self, pixels, deltas, labels=None):
+        """
+        Recolors an (N, 3) array of RGB pixels, once per distinct color when unique is set.
+        """
+        if not self.unique:
+            return self.recolor_pixels(pixels, deltas, labels)
+
+        # recolor each distinct color once and gather the pixels from the
+        # resulting table
+        colors, _counts, index = get_pixels_histogram(pixels)
+        if labels is not None:
+            _, first = np.unique(index, return_index=True)
+            labels = labels[first]
+        table = self.recolor_pixels(colors, deltas, labels)
+        return table[index]
+
+    def export_lut(self, color_dict, size=33):
+        """
+        Samples the recoloring on a regular RGB grid, as a 3D lookup table
+        that can be applied to any image of the same content (see webicd.cube).
+        The grid colors are labeled by the model prediction, which for
+        quantizers follows their own pixel assignment.
+
+        Args:
+            color_dict (dict): The new color of each palette color.
+            size (int, optional): The number of grid points of each channel. Defaults to 33.
+        Returns:
+            np.ndarray: The (size, size, size, 3) uint8 table, indexed by [r, g, b].
+        """
+        deltas = RecolorCluster.deltas(self.model.cluster_centers_, color_dict)
+        axis = np.linspace(0, 255, size)
+        grid = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1)
+        lut = self.recolor_pixels(grid.reshape(-1, 3), deltas)
+        return lut.reshape(size, size, size, 3)
 
     def execute(self, image: Image, color_dict):
-        # get image array
-        array = np.asarray(image)
-        # print(array)
-        # print("=================")
-        # reshape to transform array in list of rgb colors
-        # print(array.shape)
-        (m, n, k) = array.shape
-        array = np.reshape(array, (m*n, k))
-
-        # transform to luv
-        array = np.apply_along_axis(rgb_to_luv_gama, 1, array)
-        # print(array)
-        # print("=================")
-        # predict color for all arrays
-        labels = self.model.predict(array)
-        pivot_colors = self.model.cluster_centers_
-
-        array = np.array(list(map(RecolorCluster.recolor2(
-            array, labels, color_dict, pivot_colors), range(len(array)))))
-
-        # print(array)
-        # print("=================")
-        array = np.apply_along_axis(luv_gama_to_rgb, 1, array)
-        array = np.reshape(array, (m, n, k))
-
-        # for i in range(len(array)):
-        #   row = array[i]
-        #   for j in range(len(row)):
-        #     pixel_color = array[i,j]
-        #     # print(pixel_color)
-        #     pixel_color_luv = rgb_to_luv(pixel_color)
-        #     cluster_label = self.model.predict([pixel_color_luv])
-        #     label_color = tuple(colors[cluster_label][0])
-        #     label_color_recolor = color_dict[label_color]
-        #     new_pixel_color_luv = RecolorCluster.translate(pixel_color_luv, label_color, label_color_recolor)
-        #     new_pixel_color = luv_chroma_to_rgb(new_pixel_color_luv)
-        #     new_pixel_color = list(map(lambda x: int(x), new_pixel_color))
-        #     # print(pixel_color)
-        #     # print(new_pixel_color)
-        #     array[i,j] = new_pixel_color
-        #     # print(array[i,j])
-        #     # print(pixel_color)
-
-        # print(array)
-        # print(array.shape)
-        array = array.astype('uint8')
-        # print("=======================")
-        # print(array)
-        # print(array.shape)
-        return array
+        (n, m) = image.size
+        k = len(image.getbands())
+        labels = self.pixel_labels(image)
+        deltas = RecolorCluster.deltas(self.model.cluster_centers_, color_dict)
+
+        # process the image in bands of rows, so that only the output is
+        # allocated at full size
+        output = np.empty((m, n, k), dtype=np.uint8)
+
+        def recolor_rows(start):
+            stop = min(start + rows, m)
+            band = np.asarray(image.crop((0, start, n, stop))).reshape(-1, k)
+            band_labels = None if labels is None else labels[start * n:stop * n]
+            output[start:stop] = self.recolor_band(
+                band, deltas, band_labels).reshape(stop - start, n, k)
+
+        n_jobs = self.n_jobs or 1
+        if self.tile_rows is not None:
+            rows = max(1, self.tile_rows)
+        else:
+            rows = max(1, -(-m // n_jobs))
+
+        if n_jobs == 1:
+            for start in range(0, m, rows):
+                recolor_rows(start)
+        else:
+            # bands are independent and numpy releases the GIL, each thread
+            # writes its own rows of the output
+            image.load()
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                list(executor.map(recolor_rows, range(0, m, rows)))
+
+        return output
@@ -0,0 +1,168 @@
+from argparse import ArgumentParser
+from itertools import product
+
+import numpy as np
+
+from webicd.convert import luv_gama_to_rgb_ar, rgb_to_luv_gama_ar
+
+# Bounds of the quantized Luv grid used by the inverse table.
+LUV_GAMA_BOUNDS = ((0, 100), (-100, 200), (-150, 150))
+
+# The inverse table interpolates between grid points. Colors darker than
+# LUV_GAMA_EXACT_L, where the conversion is too steep for the grid, colors
+# outside of LUV_GAMA_BOUNDS and colors in cells whose corners differ by more
+# than LUV_GAMA_MAX_SPREAD levels (crossed by a discontinuity of the
+# conversion) are converted exactly instead.
+LUV_GAMA_EXACT_L = 5
+LUV_GAMA_MAX_SPREAD = 32
+
+RGB_TO_LUV_GAMA_TABLE = None
+LUV_GAMA_TO_RGB_TABLE = None
+
+
+def build_rgb_table(path, dtype=np.float32):
+    """
+    Builds the sRGB -> Luv table for every 8-bit color and saves it as a .npy file.
+
+    Args:
+        path (str): The output file.
+        dtype (np.dtype, optional): The table dtype. Defaults to np.float32.
+    Returns:
+        np.memmap: The table, indexed by (r << 16) | (g << 8) | b.
+    """
+    table = np.lib.format.open_memmap(
+        path, mode='w+', dtype=dtype, shape=(256 ** 3, 3))
+    g, b = np.meshgrid(np.arange(256), np.arange(256), indexing='ij')
+    for r in range(256):
+        rgb = np.stack((np.full_like(g, r), g, b), axis=-1).reshape(-1, 3)
+        table[r * 65536:(r + 1) * 65536] = rgb_to_luv_gama_ar(rgb)
+    table.flush()
+    return table
+
+
+def build_luv_table(path, step=1.0, dtype=np.float32):
+    """
+    Builds the quantized Luv -> sRGB table over LUV_GAMA_BOUNDS and saves it as a .npy file.
+
+    Args:
+        path (str): The output file.
+        step (float, optional): The grid step in Luv units, adjusted to divide each bound. Defaults to 1.0.
+        dtype (np.dtype, optional): The table dtype. Defaults to np.float32.
+    Returns:
+        np.memmap: The table, with shape (nL, nu, nv, 3).
+    """
+    # both ends are grid points, as luv_gama_to_rgb_lut assumes
+    axes = [np.linspace(low, high, int(round((high - low) / step)) + 1)
+            for (low, high) in LUV_GAMA_BOUNDS]
+    shape = tuple(len(axis) for axis in axes) + (3,)
+    table = np.lib.format.open_memmap(
+        path, mode='w+', dtype=dtype, shape=shape)
+    u, v = np.meshgrid(axes[1], axes[2], indexing='ij')
+    for i, L in enumerate(axes[0]):
+        luv = np.stack((np.full_like(u, L), u, v), axis=-1)
+        table[i] = luv_gama_to_rgb_ar(luv)
+    table.flush()
+    return table
+
+
+def load_tables(rgb_path=None, luv_path=None):
+    """
+    Memory-maps the conversion tables so every process shares one copy.
+
+    Args:
+        rgb_path (str, optional): The sRGB -> Luv table. Defaults to None.
+        luv_path (str, optional): The Luv -> sRGB table. Defaults to None.
+    Returns:
+        None
+    """
+    global RGB_TO_LUV_GAMA_TABLE, LUV_GAMA_TO_RGB_TABLE
+    if rgb_path:
+        RGB_TO_LUV_GAMA_TABLE = np.load(rgb_path, mmap_mode='r')
+    if luv_path:
+        LUV_GAMA_TO_RGB_TABLE = np.load(luv_path, mmap_mode='r')
+
+
+def rgb_to_luv_gama_lut(rgb, dtype=None):
+    """
+    Converts sRGB colors to Luv, using the lookup table for uint8 input when loaded.
+
+    Args:
+        rgb (np.ndarray): The colors, with the channels in the last axis.
+        dtype (np.dtype, optional): The dtype of the result. Defaults to None (the float dtype
+            of the input, float64 for integer input).
+    Returns:
+        np.ndarray: The Luv colors.
+    """
+    rgb = np.asarray(rgb)
+    if RGB_TO_LUV_GAMA_TABLE is None or rgb.dtype != np.uint8:
+        return rgb_to_luv_gama_ar(rgb, dtype)
+    index = (rgb[..., 0].astype(np.uint32) << 16) | \
+        (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+    return RGB_TO_LUV_GAMA_TABLE[index].astype(float if dtype is None else dtype, copy=False)
+
+
+def luv_gama_to_rgb_lut(luv):
+    """
+    Converts Luv colors to sRGB, interpolating trilinearly between the 8
+    nearest points of the quantized table when loaded.
+
+    With the default 1 unit grid, the round trip of every 8-bit color stays
+    within 8 levels of the exact conversion, and the other visible colors
+    within 15 (99.99% of them within 7).
+
+    Args:
+        luv (np.ndarray): The colors, with the channels in the last axis.
+    Returns:
+        np.ndarray: The sRGB colors.
+    """
+    luv = np.asarray(luv)
+    if LUV_GAMA_TO_RGB_TABLE is None:
+        return luv_gama_to_rgb_ar(luv)
+    shape = luv.shape
+    luv = luv.reshape(-1, 3)
+    dtype = luv.dtype if np.issubdtype(luv.dtype, np.floating) else float
+
+    exact = luv[:, 0] < LUV_GAMA_EXACT_L
+    index = []
+    weights = []
+    for k, (low, high) in enumerate(LUV_GAMA_BOUNDS):
+        n = LUV_GAMA_TO_RGB_TABLE.shape[k]
+        step = (high - low) / (n - 1)
+        x = (luv[:, k] - low) / step
+        exact |= ~((x >= 0) & (x <= n - 1))
+        x = np.clip(np.nan_to_num(x), 0, n - 1)
+        i = np.minimum(np.floor(x).astype(np.intp), n - 2)
+        index.append(i)
+        weights.append((x - i).astype(dtype, copy=False)[:, np.newaxis])
+
+    rgb = np.zeros((len(luv), 3), dtype=dtype)
+    lowest = np.full((len(luv), 3), np.inf, dtype=dtype)
+    highest = np.full((len(luv), 3), -np.inf, dtype=dtype)
+    for corner in product((0, 1), repeat=3):
+        weight = 1
+        for (c, w) in zip(corner, weights):
+            weight = weight * (w if c else 1 - w)
+        value = LUV_GAMA_TO_RGB_TABLE[index[0] + corner[0],
+                                      index[1] + corner[1],
+                                      index[2] + corner[2]]
+        rgb += weight * value
+        np.minimum(lowest, value, out=lowest)
+        np.maximum(highest, value, out=highest)
+
+    exact |= np.any(highest - lowest > LUV_GAMA_MAX_SPREAD, axis=-1)
+    if exact.any():
+        rgb[exact] = luv_gama_to_rgb_ar(luv[exact])
+    return rgb.reshape(shape)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Builds the color conversion tables.')
+    parser.add_argument('--rgb', metavar='path', type=str,
+                        default='rgb_to_luv_gama.npy')
+    parser.add_argument('--luv', metavar='path', type=str,
+                        default='luv_gama_to_rgb.npy')
+    parser.add_argument('--step', metavar='float', type=float, default=1.0)
+    args = parser.parse_args()
+
+    build_rgb_table(args.rgb)
+    build_luv_table(args.luv, args.step)
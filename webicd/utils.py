@@ -1,11 +1,70 @@
 import math
+import random as global_random
+from contextlib import contextmanager
 from random import randint, random, seed, uniform
+from threading import Lock
 
 import numpy as np
 from PIL.Image import Image
 
-from webicd.convert import (WHITEREF, luv_chroma_to_xyz, luv_gama_to_xyz,
-                            rgb_to_luv_chroma)
+from webicd.convert import (WHITEREF, luv_chroma_to_xyz, luv_chroma_to_xyz_ar,
+                            luv_gama_to_xyz, luv_gama_to_xyz_ar,
+                            rgb_to_luv_chroma, rgb_to_luv_chroma_ar)
+from webicd.gamut import get_gamut, is_visible_xyz
+
+
+def get_colors_histogram(image: Image, max=None):
+    """
+    Receives an image and returns its colors, their count and the color of each pixel.
+
+    Args:
+        image (Image): The input image.
+        max (int, optional): The maximum number of colors to return. Defaults to None.
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The (k, 3) uint8 colors and their (k,) counts,
+            most frequent first, and the (w*h,) index of the color of each pixel in them
+            (-1 for pixels whose color was left out by max).
+    """
+    return get_pixels_histogram(np.asarray(image.convert('RGB')), max)
+
+
+def get_pixels_histogram(pixels, max=None):
+    """
+    Same as get_colors_histogram, for an array of RGB pixels.
+
+    Args:
+        pixels (np.ndarray): The uint8 pixels, with the channels in the last axis.
+        max (int, optional): The maximum number of colors to return. Defaults to None.
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The colors, their counts and the color of each pixel.
+    """
+    pixels = np.reshape(pixels, (-1, 3))
+    packed = (pixels[:, 0].astype(np.uint32) << 16) | \
+        (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 2]
+    unique, inverse, counts = np.unique(
+        packed, return_inverse=True, return_counts=True)
+
+    n = len(unique)
+    candidates = np.arange(n)
+    if max is not None and max <= 0:
+        candidates = candidates[:0]
+    elif max is not None and max < n:
+        # keep every color tied with the max-th greatest count
+        kth = np.partition(counts, n - max)[n - max]
+        candidates = np.flatnonzero(counts >= kth)
+
+    # same order as sorting the (count, color) tuples in reverse
+    order = candidates[np.lexsort((-unique[candidates].astype(np.int64),
+                                   -counts[candidates]))]
+    if max is not None:
+        order = order[:max]
+
+    index = np.full(n, -1, dtype=np.intp)
+    index[order] = np.arange(len(order))
+    colors = np.stack(((unique[order] >> 16) & 255,
+                       (unique[order] >> 8) & 255,
+                       unique[order] & 255), axis=-1).astype(np.uint8)
+    return colors, counts[order], index[inverse]
 
 
 def get_colors_count(image: Image, max=None):
@@ -18,11 +77,8 @@ def get_colors_count(image: Image, max=None):
     Returns:
         list[tuple[int, int]]: A list of tuples in the format (count, color).
     """
-    colors = image.getcolors(image.size[0]*image.size[1])
-    colors = sorted(colors, reverse=True)
-    if max is not None:
-        colors = colors[0:max]
-    return colors
+    colors, counts, _ = get_colors_histogram(image, max)
+    return list(zip(counts.tolist(), map(tuple, colors.tolist())))
 
 
 def get_colors(image: Image, max=None):
@@ -38,6 +94,28 @@ def get_colors(image: Image, max=None):
     return list(map(lambda x: x[1], get_colors_count(image, max)))
 
 
+def resize_to_budget(image: Image, max_pixels=None):
+    """
+    Downsamples an image to at most max_pixels pixels, keeping its aspect ratio.
+
+    Args:
+        image (Image): The input image.
+        max_pixels (int, optional): The pixel budget. Defaults to None (no resize).
+    Returns:
+        Image: The image itself when it fits the budget, a resized copy otherwise.
+    Raises:
+        ValueError: If max_pixels is not positive.
+    """
+    if max_pixels is not None and max_pixels <= 0:
+        raise ValueError(f'The pixel budget must be positive, got {max_pixels}')
+    (width, height) = image.size
+    if max_pixels is None or width * height <= max_pixels:
+        return image
+    scale = math.sqrt(max_pixels / (width * height))
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return image.resize(size)
+
+
 def random_rgb(random_state=None):
     """
     Generates a random RGB color.
@@ -66,6 +144,72 @@ def random_luv(random_state=None):
     return rgb_to_luv_chroma(random_rgb(random_state))
 
 
+def random_rgb_ar(size, rng):
+    """
+    Generates random RGB colors.
+
+    Args:
+        size (int): The number of colors.
+        rng (np.random.Generator): The random generator.
+    Returns:
+        np.ndarray: The (size, 3) RGB colors.
+    """
+    return rng.integers(0, 256, (size, 3))
+
+
+def random_luv_ar(size, rng):
+    """
+    Generates random LUV colors.
+
+    Args:
+        size (int): The number of colors.
+        rng (np.random.Generator): The random generator.
+    Returns:
+        np.ndarray: The (size, 3) LUV colors.
+    """
+    return rgb_to_luv_chroma_ar(random_rgb_ar(size, rng))
+
+
+def random_visible_luv_ar(size, rng):
+    """
+    Generates random visible LUV colors, drawn from the visible gamut (see webicd.gamut).
+
+    Args:
+        size (int): The number of colors.
+        rng (np.random.Generator): The random generator.
+    Returns:
+        np.ndarray: The (size, 3) LUV colors.
+    """
+    return get_gamut('chroma').sample(size, rng)
+
+
+_GLOBAL_RANDOM_LOCK = Lock()
+
+
+@contextmanager
+def global_random_state(random_state=None):
+    """
+    Seeds the global `random` and `numpy.random` states for code that only uses
+    them (e.g. pygad), holding a lock so concurrent requests do not clobber each
+    other, and restores the previous states on exit.
+
+    Args:
+        random_state (int, optional): The random state. Defaults to None.
+    Returns:
+        None
+    """
+    with _GLOBAL_RANDOM_LOCK:
+        state = global_random.getstate()
+        np_state = np.random.get_state()
+        global_random.seed(random_state)
+        np.random.seed(random_state)
+        try:
+            yield
+        finally:
+            global_random.setstate(state)
+            np.random.set_state(np_state)
+
+
 def is_visible_luv_chroma(luv):
     """
     Checks if a LUV color is visible.
@@ -98,21 +242,41 @@ def is_visible_luv_gama(luv):
     return 0 <= X and X <= WHITEREF[0] and 0 <= Y and Y <= WHITEREF[1] and 0 <= Z and Z <= WHITEREF[2]
 
 
-def random_luv_chroma(luminance):
+def is_visible_luv_chroma_ar(luv):
+    """
+    Checks if LUV colors are visible.
+
+    Args:
+        luv (np.ndarray): The LUV colors, with the channels in the last axis.
+    Returns:
+        np.ndarray: True for the visible colors.
+    """
+    return is_visible_xyz(luv_chroma_to_xyz_ar(luv))
+
+
+def is_visible_luv_gama_ar(luv):
+    """
+    Checks if LUV colors are visible.
+
+    Args:
+        luv (np.ndarray): The LUV colors, with the channels in the last axis.
+    Returns:
+        np.ndarray: True for the visible colors.
+    """
+    return is_visible_xyz(luv_gama_to_xyz_ar(luv))
+
+
+def random_luv_chroma(luminance, rng=None):
     """
-    Generates a random LUV color with a given luminance.
+    Generates a random visible LUV color with a given luminance.
 
     Args:
         luminance (float): The luminance.
+        rng (np.random.Generator, optional): The random generator. Defaults to a new one.
     Returns:
         list[float]: A list with the LUV color.
     """
-    u = random() * 0.7
-    v = random() * 0.6
-    while (not is_visible_luv_chroma([luminance, u, v])):
-        u = random() * 0.7
-        v = random() * 0.6
-    return [luminance, u, v]
+    return get_gamut('chroma').sample(1, rng, luminance=luminance)[0].tolist()
 
 
 def color_distance(color_a, color_b):